@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基金API异步接口：请求以协程方式在一个后台事件循环线程中并发执行（需要安装 aiohttp）
+"""
+
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from api.fund_api import (
+    FundAPI, MARKET_INDICES, FUND_RANK_URL, parse_fund_info_page, parse_net_value_list,
+    latest_net_value, parse_fund_rank_page, merge_market_index_snapshot, fund_rank_params,
+    fund_rank_cache_key
+)
+from api.quote_sources import get_quote_source_racer
+from api.response_cache import get_response_cache
+from database.db_manager import FundDB
+
+class AsyncLoopThread:
+    """运行asyncio事件循环的后台线程，其他线程通过 submit 提交协程"""
+
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动事件循环线程（已启动时直接返回）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run, name='fund-api-loop', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """线程入口"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """
+        提交协程到事件循环
+        :param coro: 协程对象
+        :return: concurrent.futures.Future，可在任意线程等待或添加回调
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        """停止事件循环并等待线程退出"""
+        with self._lock:
+            thread, loop = self._thread, self.loop
+            self._thread = None
+        if thread is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+# 所有AsyncFundAPI实例共享的事件循环线程
+_loop_thread = AsyncLoopThread()
+
+def get_loop_thread():
+    """获取共享的事件循环线程"""
+    return _loop_thread
+
+class AsyncFundAPI:
+    """
+    FundAPI 的异步版本，接口与 FundAPI 一致但返回协程。
+    所有请求在同一个事件循环线程中执行，由信号量限制总并发数和单个主机的并发数，
+    数百个请求同时进行也不需要额外的线程。
+    """
+
+    FUND_INFO_URL = FundAPI.FUND_INFO_URL
+    FUND_NET_VALUE_URL = FundAPI.FUND_NET_VALUE_URL
+    FUND_INFO_CACHE_TTL = FundAPI.FUND_INFO_CACHE_TTL
+
+    def __init__(self, max_concurrency=100, per_host_limit=20, loop_thread=None):
+        """
+        :param max_concurrency: 最大并发请求数
+        :param per_host_limit: 单个主机的最大并发请求数
+        :param loop_thread: 事件循环线程，默认使用共享线程
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncFundAPI 需要安装 aiohttp：pip install aiohttp")
+        self.headers = FundAPI().headers
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.loop_thread = loop_thread or _loop_thread
+        # 以下对象只在事件循环线程中创建和使用
+        self._session = None
+        self._semaphore = None
+        self._host_semaphores = {}
+
+    def _get_session(self):
+        """
+        获取HTTP会话，不存在时创建（在事件循环线程中调用）
+        :return: aiohttp.ClientSession
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host_limit)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._host_semaphores = {}
+        return self._session
+
+    def _host_semaphore(self, url):
+        """
+        获取主机对应的信号量
+        :param url: 请求地址
+        :return: asyncio.Semaphore
+        """
+        host = urlparse(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def _get_text(self, url, params=None, timeout=10, encoding='utf-8', headers=None):
+        """
+        发送GET请求
+        :param url: 请求地址
+        :param params: 请求参数
+        :param timeout: 超时时间（秒）
+        :param encoding: 响应编码
+        :param headers: 额外的请求头
+        :return: 响应文本
+        """
+        session = self._get_session()
+        params = {k: str(v) for k, v in params.items()} if params else None
+        async with self._semaphore, self._host_semaphore(url):
+            async with session.get(url, params=params, headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                return await response.text(encoding=encoding, errors='replace')
+
+    @staticmethod
+    def _load_fund_info_cache(fund_code, ttl):
+        """读取基金信息缓存（在线程池中执行，避免阻塞事件循环）"""
+        db = FundDB()
+        fund_info = db.get_fund_info_cache(fund_code, ttl)
+        db.close()
+        return fund_info
+
+    @staticmethod
+    def _save_fund_info_cache(fund_code, name, fund_type):
+        """写入基金信息缓存（在线程池中执行，避免阻塞事件循环）"""
+        db = FundDB()
+        db.save_fund_info_cache(fund_code, name, fund_type)
+        db.close()
+
+    async def get_fund_info(self, fund_code, use_cache=True):
+        """
+        获取基金基本信息
+        :param fund_code: 基金代码
+        :param use_cache: 是否优先使用本地缓存
+        :return: 基金信息字典
+        """
+        loop = asyncio.get_running_loop()
+        if use_cache:
+            fund_info = await loop.run_in_executor(
+                None, self._load_fund_info_cache, fund_code, self.FUND_INFO_CACHE_TTL)
+            if fund_info:
+                return fund_info
+
+        try:
+            text = await self._get_text(self.FUND_INFO_URL.format(fund_code=fund_code))
+            fund_info, matched = parse_fund_info_page(fund_code, text)
+
+            # 只缓存解析成功的结果
+            if matched:
+                await loop.run_in_executor(
+                    None, self._save_fund_info_cache, fund_code, fund_info['name'], fund_info['type'])
+
+            return fund_info
+        except Exception as e:
+            print(f"获取基金信息失败: {e}")
+            return None
+
+    async def get_fund_net_value(self, fund_code):
+        """
+        获取基金净值数据
+        :param fund_code: 基金代码
+        :return: 净值数据字典
+        """
+        try:
+            params = {
+                'fundCode': fund_code,
+                'pageIndex': 1,
+                'pageSize': 1,
+                '_': int(time.time() * 1000)
+            }
+            text = await self._get_text(self.FUND_NET_VALUE_URL, params=params)
+            return latest_net_value(fund_code, parse_net_value_list(json.loads(text)))
+        except Exception as e:
+            print(f"获取基金净值失败: {e}")
+            return None
+
+    async def get_fund_net_value_history(self, fund_code, page_index=1, page_size=20, start_date='', end_date=''):
+        """
+        分页获取基金历史净值
+        :param fund_code: 基金代码
+        :param page_index: 页码，从1开始
+        :param page_size: 每页条数
+        :param start_date: 起始日期（YYYY-MM-DD），为空时不限制
+        :param end_date: 截止日期（YYYY-MM-DD），为空时不限制
+        :return: (净值列表（按日期倒序）, 总条数)，失败返回None
+        """
+        try:
+            params = {
+                'fundCode': fund_code,
+                'pageIndex': page_index,
+                'pageSize': page_size,
+                'startDate': start_date,
+                'endDate': end_date,
+                '_': int(time.time() * 1000)
+            }
+            text = await self._get_text(self.FUND_NET_VALUE_URL, params=params)
+            return parse_net_value_list(json.loads(text))
+        except Exception as e:
+            print(f"获取基金历史净值失败: {e}")
+            return None
+
+    async def get_market_index(self):
+        """
+        获取大盘指数数据
+        :return: 指数数据字典，每个指数带有获取时间 update_time
+        """
+        try:
+            # 多个行情源并发竞速，各市场指数在同一批请求中获取
+            result = await get_quote_source_racer().fetch_async(self._get_text, MARKET_INDICES)
+        except Exception as e:
+            print(f"获取大盘指数失败: {e}")
+            result = {}
+        # 未获取到的指数使用最近一次的真实数据（读写SQLite，在线程池中执行）
+        return await asyncio.get_running_loop().run_in_executor(None, merge_market_index_snapshot, result)
+
+    async def get_fund_rank(self, rank_type='涨跌幅'):
+        """
+        获取基金排行榜数据
+        :param rank_type: 排行榜类型：涨跌幅、跌幅榜、加仓榜
+        :return: 排行榜数据列表，接口失败时为最近一次获取到的数据，从未获取成功时为空列表
+        """
+        cache_key = fund_rank_cache_key(rank_type)
+        try:
+            text = await self._get_text(FUND_RANK_URL, params=fund_rank_params(rank_type))
+            result = parse_fund_rank_page(text)
+        except Exception as e:
+            print(f"获取基金排行榜失败: {e}")
+            result = None
+
+        # 响应缓存保存在SQLite中，在线程池中读写以免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        if result:
+            await loop.run_in_executor(None, get_response_cache().put, cache_key, result, FundAPI.FUND_RANK_MAX_AGE)
+            return result
+        cached = await loop.run_in_executor(None, get_response_cache().get, cache_key, FundAPI.FUND_RANK_MAX_AGE)
+        return cached.value if cached else []
+
+    async def gather(self, method, args):
+        """
+        并发调用同一个接口
+        :param method: 异步接口方法，如 self.get_fund_net_value
+        :param args: 参数列表，每个元素作为一次调用的唯一参数
+        :return: 结果列表，顺序与参数一致
+        """
+        return await asyncio.gather(*(method(arg) for arg in args))
+
+    def submit(self, coro):
+        """
+        在事件循环线程中执行协程（可从界面线程或工作线程调用）
+        :param coro: 协程对象，如 api.get_fund_net_value('000001')
+        :return: concurrent.futures.Future，可通过 add_done_callback 转发到Qt信号
+        """
+        return self.loop_thread.submit(coro)
+
+    def run(self, coro, timeout=None):
+        """
+        在事件循环线程中执行协程并阻塞等待结果（不能在事件循环线程中调用）
+        :param coro: 协程对象
+        :param timeout: 超时时间（秒）
+        :return: 协程的返回值
+        """
+        return self.submit(coro).result(timeout)
+
+    def get_fund_net_values(self, fund_codes):
+        """
+        并发获取多只基金的净值，阻塞等待全部完成
+        :param fund_codes: 基金代码列表
+        :return: 净值数据列表，顺序与代码一致，失败的为None
+        """
+        return self.run(self.gather(self.get_fund_net_value, fund_codes))
+
+    def get_fund_infos(self, fund_codes):
+        """
+        并发获取多只基金的基本信息，阻塞等待全部完成
+        :param fund_codes: 基金代码列表
+        :return: 基金信息列表，顺序与代码一致，失败的为None
+        """
+        return self.run(self.gather(self.get_fund_info, fund_codes))
+
+    async def _close(self):
+        """关闭HTTP会话（在事件循环线程中执行）"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def close(self):
+        """关闭HTTP会话"""
+        if self.loop_thread.loop is not None:
+            self.run(self._close())
+
+_async_fund_api = None
+_async_fund_api_lock = threading.Lock()
+
+def get_async_fund_api():
+    """
+    获取全局共享的异步基金API
+    :return: AsyncFundAPI，未安装 aiohttp 时返回None
+    """
+    global _async_fund_api
+    if aiohttp is None:
+        return None
+    with _async_fund_api_lock:
+        if _async_fund_api is None:
+            _async_fund_api = AsyncFundAPI()
+        return _async_fund_api
+
+if __name__ == '__main__':
+    # 基准测试：本地模拟服务器上比较线程池 + FundAPI 与 AsyncFundAPI
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    from api.fund_api import get_session_pool, get_request_coalescer
+
+    FUND_COUNT = 500
+    LATENCY = 0.05  # 模拟的接口延迟（秒）
+
+    class MockHandler(BaseHTTPRequestHandler):
+        """返回固定净值数据的模拟接口"""
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(LATENCY)
+            body = json.dumps({
+                'Data': {'LSJZList': [{'FSRQ': '2024-01-02', 'DWJZ': '1.2345', 'LJJZ': '2.3456', 'JZZZL': '0.12'}]},
+                'TotalCount': 1
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    if aiohttp is None:
+        print("未安装 aiohttp，无法运行异步基准测试：pip install aiohttp")
+        sys.exit(1)
+
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    net_value_url = f"http://127.0.0.1:{server.server_port}/f10/lsjz"
+    fund_codes = [f"{i:06d}" for i in range(FUND_COUNT)]
+    print(f"{FUND_COUNT} 只基金，模拟接口延迟 {LATENCY * 1000:.0f}ms")
+
+    # 线程池 + 同步FundAPI（关闭请求合并的结果复用，每轮都实际发送请求）
+    get_request_coalescer().ttl = 0
+    for workers in (8, 32, 100):
+        get_session_pool().configure(workers)
+        api = FundAPI()
+        api.FUND_NET_VALUE_URL = net_value_url
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(api.get_fund_net_value, fund_codes))
+            threads_used = len(executor._threads)
+        elapsed = time.time() - start
+        ok = sum(1 for item in results if item)
+        print(f"线程池 {workers:>3} 线程: {elapsed:.2f}s, 成功 {ok}, 工作线程 {threads_used}")
+
+    # 异步FundAPI
+    for concurrency in (8, 32, 100):
+        async_api = AsyncFundAPI(max_concurrency=concurrency, per_host_limit=concurrency,
+                                 loop_thread=AsyncLoopThread())
+        async_api.FUND_NET_VALUE_URL = net_value_url
+        start = time.time()
+        results = async_api.get_fund_net_values(fund_codes)
+        elapsed = time.time() - start
+        ok = sum(1 for item in results if item)
+        print(f"异步   并发 {concurrency:>3}  : {elapsed:.2f}s, 成功 {ok}, 工作线程 1")
+        async_api.close()
+        async_api.loop_thread.stop()
+
+    server.shutdown()
@@ -6,46 +6,430 @@
 
 import requests
 import json
+import re
 import time
+import threading
+from concurrent.futures import Future
 from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from api.fund_quote import parse_number
+from api.quote_sources import get_quote_source_racer
+from api.response_cache import get_response_cache
+from database.db_manager import FundDB
+
+class HTTPSessionPool:
+    """按主机复用的HTTP会话池，保持长连接"""
+    
+    def __init__(self, pool_maxsize=10):
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+    
+    def get_session(self, host):
+        """
+        获取指定主机的会话，不存在时创建
+        :param host: 主机名
+        :return: requests.Session
+        """
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['Connection'] = 'keep-alive'
+                self._sessions[host] = session
+            return session
+    
+    def configure(self, pool_maxsize):
+        """
+        修改每个主机的连接池大小，之后的请求使用按新设置创建的会话
+        :param pool_maxsize: 每个主机保持的最大连接数
+        """
+        with self._lock:
+            self.pool_maxsize = max(1, int(pool_maxsize))
+            # 旧会话可能仍有进行中的请求，不主动关闭，请求结束后随引用释放被回收
+            self._sessions = {}
+    
+    def close(self):
+        """关闭所有会话"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+# 刷新、自选、行情线程共享的会话池
+_session_pool = HTTPSessionPool()
+
+def get_session_pool():
+    """获取共享的HTTP会话池"""
+    return _session_pool
+
+class ResponseSnapshot(NamedTuple):
+    """不可变的响应内容，合并的请求共享同一份，每个调用方由此生成自己的 Response 再解码"""
+    status_code: int
+    content: bytes
+    headers: Tuple[Tuple[str, str], ...]
+    url: str
+    encoding: Optional[str]
+
+    @classmethod
+    def capture(cls, response):
+        """
+        读取响应内容
+        :param response: requests.Response
+        :return: ResponseSnapshot
+        """
+        return cls(response.status_code, response.content, tuple(response.headers.items()),
+                   response.url, response.encoding)
+
+    @property
+    def ok(self):
+        """状态码是否表示成功（与 requests.Response.ok 相同）"""
+        return self.status_code < 400
+
+    def to_response(self):
+        """
+        生成新的 Response，调用方可以自由修改 encoding 等属性
+        :return: requests.Response
+        """
+        response = requests.Response()
+        response.status_code = self.status_code
+        response._content = self.content
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response.encoding = self.encoding
+        return response
+
+class RequestCoalescer:
+    """合并相同的GET请求：进行中的请求共享同一个结果，刚完成的请求在短时间内直接复用"""
+    
+    def __init__(self, ttl=3.0):
+        self.ttl = ttl  # 已完成请求的复用时长（秒）
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._recent = {}
+    
+    @staticmethod
+    def make_key(url, params=None):
+        """
+        生成请求键，忽略防缓存参数'_'
+        :param url: 请求地址
+        :param params: 请求参数
+        :return: 请求键
+        """
+        items = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items() if k != '_'))
+        return url, items
+    
+    def fetch(self, key, fetcher):
+        """
+        获取请求结果，相同请求只实际发送一次
+        :param key: 请求键
+        :param fetcher: 实际发送请求的函数，返回 requests.Response
+        :return: ResponseSnapshot，所有合并的调用方共享，不可修改
+        """
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent and time.time() - recent[0] <= self.ttl:
+                self.hits += 1
+                return recent[1]
+            
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+        
+        # 等待其他线程发出的相同请求
+        if not owner:
+            return future.result()
+        
+        try:
+            response = ResponseSnapshot.capture(fetcher())
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        
+        with self._lock:
+            self._inflight.pop(key, None)
+            if response.ok:
+                now = time.time()
+                self._recent[key] = (now, response)
+                # 清理过期结果
+                if len(self._recent) > 256:
+                    self._recent = {k: v for k, v in self._recent.items() if now - v[0] <= self.ttl}
+        future.set_result(response)
+        return response
+    
+    def get_stats(self):
+        """
+        获取合并统计
+        :return: {'hits': 复用次数, 'misses': 实际请求次数}
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+# 所有FundAPI实例共享的请求合并器
+_request_coalescer = RequestCoalescer()
+
+def get_request_coalescer():
+    """获取共享的请求合并器"""
+    return _request_coalescer
+
+def parse_fund_info_page(fund_code, text):
+    """
+    解析基金详情页中的名称和类型
+    :param fund_code: 基金代码
+    :param text: 页面内容
+    :return: (基金信息字典, 是否解析到名称)
+    """
+    name_match = re.search(r'基金名称：</span><span class="funCur-FundName">(.*?)</span>', text)
+    fund_name = name_match.group(1) if name_match else "未知基金"
+    
+    type_match = re.search(r'基金类型：</span><span>(.*?)</span>', text)
+    fund_type = type_match.group(1) if type_match else "未知类型"
+    
+    return {'code': fund_code, 'name': fund_name, 'type': fund_type}, bool(name_match)
+
+def parse_net_value_list(data):
+    """
+    解析历史净值接口返回的JSON
+    :param data: 接口返回的字典
+    :return: (净值列表（按日期倒序）, 总条数)，数据无效返回None
+    """
+    if not data.get('Data'):
+        return None
+    
+    result = []
+    for item in data['Data'].get('LSJZList') or []:
+        result.append({
+            'date': item.get('FSRQ', ''),  # 公布日期
+            'net_value': parse_number(item.get('DWJZ')),  # 单位净值
+            'acc_value': parse_number(item.get('LJJZ')),  # 累计净值
+            'day_growth': parse_number(item.get('JZZZL'))  # 日增长率
+        })
+    return result, int(data.get('TotalCount') or 0)
+
+def latest_net_value(fund_code, net_value_list):
+    """
+    取历史净值中的最新一条
+    :param fund_code: 基金代码
+    :param net_value_list: parse_net_value_list 的返回值
+    :return: 净值数据字典，没有数据返回None
+    """
+    if not net_value_list or not net_value_list[0]:
+        return None
+    latest = net_value_list[0][0]
+    return {
+        'code': fund_code,
+        'net_value': latest['net_value'],  # 单位净值
+        'day_growth': latest['day_growth'],  # 日增长率
+        'date': latest['date']  # 公布日期
+    }
+
+def parse_fund_rank_page(text):
+    """
+    解析基金排行接口返回的内容
+    :param text: 接口返回的文本（var db=[...];）
+    :return: 前10名基金列表
+    """
+    data_match = re.search(r'var db=(\[.*?\]);', text)
+    if not data_match:
+        return []
+    
+    result = []
+    for item in json.loads(data_match.group(1)):
+        fund_info = item.split(',')
+        if len(fund_info) > 10:
+            result.append({
+                'code': fund_info[0],
+                'name': fund_info[1],
+                'net_value': fund_info[3],
+                'day_growth': fund_info[4],
+                'week_growth': fund_info[5],
+                'month_growth': fund_info[6],
+                'year_growth': fund_info[9]
+            })
+    return result[:10]  # 返回前10名
+
+# 基金排行接口
+FUND_RANK_URL = "http://fund.eastmoney.com/data/rankhandler.aspx"
+
+# 大盘指数：A股使用交易所代码，其他市场使用 市场前缀+指数代码，由各行情源转换为自己的代码
+MARKET_INDICES = {
+    '上证指数': '000001',
+    '深证成指': '399001',
+    '创业板指': '399006',
+    '科创50': '000688',
+    '北证50': '899050',
+    '上证50': '000016',
+    '沪深300': '000300',
+    '中证500': '000905',
+    '中证1000': '000852',
+    '恒生指数': 'hkHSI',
+    '恒生科技': 'hkHSTECH',
+    '恒生国企': 'hkHSCEI',
+    '纳斯达克': 'usIXIC',
+    '标普500': 'usSPX',
+    '道琼斯': 'usDJI',
+    '日经225': 'jpN225',
+    '印度孟买sensex': 'inSENSEX',
+    '越南胡志明': 'vnHOSE'
+}
+
+# 接口响应缓存键：最近一次获取到的真实数据，接口失败时使用
+MARKET_INDEX_CACHE_KEY = 'market_index'
+
+# 合并指数快照的读-改-写需要串行执行，否则并发的合并会覆盖彼此刚获取到的指数
+_market_index_snapshot_lock = threading.Lock()
+
+def fund_rank_cache_key(rank_type):
+    """
+    排行榜的接口响应缓存键
+    :param rank_type: 排行榜类型
+    :return: 缓存键
+    """
+    return f'fund_rank:{rank_type}'
+
+def merge_market_index_snapshot(result):
+    """
+    将新获取的指数行情合并到本地保存的最近快照中，本次未获取到的指数沿用快照中的数据
+    :param result: {指数名称: 指数行情}，可以为空
+    :return: 合并后的指数数据，从未成功获取过时为空字典
+    """
+    cache = get_response_cache()
+    with _market_index_snapshot_lock:
+        cached = cache.get(MARKET_INDEX_CACHE_KEY, FundAPI.MARKET_INDEX_MAX_AGE)
+        snapshot = dict(cached.value) if cached else {}
+        
+        if result:
+            now = time.time()
+            for quote in result.values():
+                quote['update_time'] = now
+            snapshot.update(result)
+            cache.put(MARKET_INDEX_CACHE_KEY, snapshot)
+    return snapshot
+
+def fund_rank_params(rank_type):
+    """
+    生成基金排行接口的请求参数
+    :param rank_type: 排行榜类型：涨跌幅、跌幅榜、加仓榜
+    :return: 请求参数字典
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    params = {
+        'op': 'ph',
+        'dt': 'kf',
+        'ft': 'all',
+        'rs': '',
+        'gs': 0,
+        'sc': '1nzf',  # 日涨跌幅
+        'st': '-1',  # 降序
+        'sd': today,
+        'ed': today,
+        'qdii': '',
+        'tabSubtype': ',,',
+        'pi': 1,
+        'pn': 20,
+        'dx': 1,
+        '_': int(time.time() * 1000)
+    }
+    if rank_type == '跌幅榜':
+        params['st'] = '1'  # 升序
+    elif rank_type == '加仓榜':
+        params['sc'] = '7yjjz'  # 近7日净值增长
+    return params
 
 class FundAPI:
     """基金API接口类"""
     
-    def __init__(self):
+    FUND_INFO_URL = "http://fund.eastmoney.com/{fund_code}.html"
+    FUND_NET_VALUE_URL = "http://api.fund.eastmoney.com/f10/lsjz"
+    FUND_LIST_URL = "http://fund.eastmoney.com/js/fundcode_search.js"
+    FUND_INFO_CACHE_TTL = 7 * 24 * 3600  # 基金名称、类型缓存有效期（秒）
+    MARKET_INDEX_MAX_AGE = 60  # 大盘指数有效期（秒），超过后显示为过期
+    FUND_RANK_MAX_AGE = 300  # 排行榜有效期（秒）
+    
+    def __init__(self, session_pool=None, coalescer=None, response_cache=None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.session_pool = session_pool or _session_pool
+        self.coalescer = coalescer or _request_coalescer
+        self.response_cache = response_cache or get_response_cache()
     
-    def get_fund_info(self, fund_code):
+    def _get(self, url, coalesce=True, **kwargs):
+        """
+        通过主机对应的长连接会话发送GET请求
+        :param url: 请求地址
+        :param coalesce: 是否与相同的请求合并
+        :return: requests.Response
+        """
+        kwargs.setdefault('headers', self.headers)
+        session = self.session_pool.get_session(urlparse(url).netloc)
+        if not coalesce:
+            return session.get(url, **kwargs)
+        key = self.coalescer.make_key(url, kwargs.get('params'))
+        # 合并的请求共享不可变的响应内容，每个调用方得到各自的 Response
+        return self.coalescer.fetch(key, lambda: session.get(url, **kwargs)).to_response()
+    
+    def get_fund_info(self, fund_code, use_cache=True):
         """
         获取基金基本信息
         :param fund_code: 基金代码
+        :param use_cache: 是否优先使用本地缓存
         :return: 基金信息字典
         """
+        if use_cache:
+            db = FundDB()
+            fund_info = db.get_fund_info_cache(fund_code, self.FUND_INFO_CACHE_TTL)
+            db.close()
+            if fund_info:
+                return fund_info
+        
         try:
-            url = f"http://fund.eastmoney.com/{fund_code}.html"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            url = self.FUND_INFO_URL.format(fund_code=fund_code)
+            response = self._get(url, timeout=10)
             response.encoding = 'utf-8'
             
-            # 解析基金名称
-            import re
-            name_match = re.search(r'基金名称：</span><span class="funCur-FundName">(.*?)</span>', response.text)
-            fund_name = name_match.group(1) if name_match else "未知基金"
+            # 解析基金名称和类型
+            fund_info, matched = parse_fund_info_page(fund_code, response.text)
             
-            # 解析基金类型
-            type_match = re.search(r'基金类型：</span><span>(.*?)</span>', response.text)
-            fund_type = type_match.group(1) if type_match else "未知类型"
+            # 只缓存解析成功的结果
+            if matched:
+                db = FundDB()
+                db.save_fund_info_cache(fund_code, fund_info['name'], fund_info['type'])
+                db.close()
             
-            return {
-                'code': fund_code,
-                'name': fund_name,
-                'type': fund_type
-            }
+            return fund_info
         except Exception as e:
             print(f"获取基金信息失败: {e}")
             return None
     
+    def invalidate_fund_info_cache(self, fund_code=None):
+        """
+        使基金基本信息缓存失效
+        :param fund_code: 基金代码，为None时清除全部缓存
+        :return: 是否成功
+        """
+        db = FundDB()
+        success = db.clear_fund_info_cache(fund_code)
+        db.close()
+        return success
+    
     def get_fund_net_value(self, fund_code):
         """
         获取基金净值数据
@@ -53,533 +437,135 @@ class FundAPI:
         :return: 净值数据字典
         """
         try:
-            url = f"http://api.fund.eastmoney.com/f10/lsjz"
+            url = self.FUND_NET_VALUE_URL
             params = {
                 'fundCode': fund_code,
                 'pageIndex': 1,
                 'pageSize': 1,
                 '_': int(time.time() * 1000)
             }
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            data = response.json()
-            
-            if data.get('Data') and data['Data'].get('LSJZList'):
-                lsjz_list = data['Data']['LSJZList']
-                if lsjz_list:
-                    latest_data = lsjz_list[0]
-                    return {
-                        'code': fund_code,
-                        'net_value': latest_data.get('DWJZ', '0'),  # 单位净值
-                        'day_growth': latest_data.get('JZZZL', '0'),  # 日增长率
-                        'date': latest_data.get('FSRQ', '')  # 公布日期
-                    }
-            return None
+            response = self._get(url, params=params, timeout=10)
+            return latest_net_value(fund_code, parse_net_value_list(response.json()))
         except Exception as e:
             print(f"获取基金净值失败: {e}")
             return None
     
+    def get_fund_net_value_history(self, fund_code, page_index=1, page_size=20, start_date='', end_date=''):
+        """
+        分页获取基金历史净值
+        :param fund_code: 基金代码
+        :param page_index: 页码，从1开始
+        :param page_size: 每页条数
+        :param start_date: 起始日期（YYYY-MM-DD），为空时不限制
+        :param end_date: 截止日期（YYYY-MM-DD），为空时不限制
+        :return: (净值列表（按日期倒序）, 总条数)，失败返回None
+        """
+        try:
+            url = self.FUND_NET_VALUE_URL
+            params = {
+                'fundCode': fund_code,
+                'pageIndex': page_index,
+                'pageSize': page_size,
+                'startDate': start_date,
+                'endDate': end_date,
+                '_': int(time.time() * 1000)
+            }
+            response = self._get(url, params=params, timeout=10)
+            return parse_net_value_list(response.json())
+        except Exception as e:
+            print(f"获取基金历史净值失败: {e}")
+            return None
+    
     def get_market_index(self):
         """
         获取大盘指数数据
-        :return: 指数数据字典
+        :return: 指数数据字典，每个指数带有获取时间 update_time
         """
         try:
-            # 尝试使用东方财富API获取A股指数数据
-            url = "http://api.fund.eastmoney.com/f10/lsjz"
-            
-            # 构建指数数据结果
-            result = {}
-            
-            # 获取A股主要指数
-            a股_indices = {
-                '上证指数': '000001',
-                '深证成指': '399001',
-                '创业板指': '399006',
-                '科创50': '000688',
-                '上证50': '000016',
-                '沪深300': '000300',
-                '中证500': '000905',
-                '中证1000': '000852'
-            }
-            
-            # 尝试从多个API获取数据
-            # 1. 尝试使用新浪财经API
-            try:
-                from urllib.parse import quote
-                
-                # 构建新浪财经API请求
-                sina_url = "http://hq.sinajs.cn/list="
-                sina_codes = []
-                code_mapping = {}
-                
-                for name, code in a股_indices.items():
-                    if code.startswith('000'):
-                        sina_code = f"sh{code}"
-                    else:
-                        sina_code = f"sz{code}"
-                    sina_codes.append(sina_code)
-                    code_mapping[sina_code] = name
-                
-                sina_url += ",".join(sina_codes)
-                response = requests.get(sina_url, headers=self.headers, timeout=5)
-                response.encoding = 'gb2312'
-                
-                # 解析新浪财经返回的数据
-                lines = response.text.strip().split('\n')
-                for line in lines:
-                    if line:
-                        parts = line.split('=')
-                        if len(parts) == 2:
-                            code = parts[0].split('_')[1]
-                            data_str = parts[1].strip('"')
-                            data = data_str.split(',')
-                            
-                            if code in code_mapping and len(data) >= 4:
-                                name = code_mapping[code]
-                                # 新浪财经数据格式：[开盘价, 昨日收盘价, 当前价, 最高价, 最低价, ...]
-                                try:
-                                    open_price = float(data[0])
-                                    prev_close = float(data[1])
-                                    current_price = float(data[2])
-                                    high_price = float(data[3])
-                                    low_price = float(data[4])
-                                    
-                                    change = current_price - prev_close
-                                    change_percent = (change / prev_close) * 100
-                                    
-                                    result[name] = {
-                                        'code': a股_indices[name],
-                                        'price': current_price,
-                                        'change': change,
-                                        'change_percent': change_percent,
-                                        'open': open_price,
-                                        'high': high_price,
-                                        'low': low_price,
-                                        'volume': 0  # 新浪API可能没有成交量数据
-                                    }
-                                except (ValueError, IndexError):
-                                    pass
-            except Exception as e:
-                print(f"新浪财经API获取失败: {e}")
-            
-            # 2. 如果新浪API失败，尝试使用腾讯财经API
-            if not result:
-                try:
-                    tencent_url = "http://qt.gtimg.cn/q="
-                    tencent_codes = []
-                    code_mapping = {}
-                    
-                    for name, code in a股_indices.items():
-                        if code.startswith('000'):
-                            tencent_code = f"sh{code}"
-                        else:
-                            tencent_code = f"sz{code}"
-                        tencent_codes.append(tencent_code)
-                        code_mapping[tencent_code] = name
-                    
-                    tencent_url += ",".join(tencent_codes)
-                    response = requests.get(tencent_url, headers=self.headers, timeout=5)
-                    response.encoding = 'gb2312'
-                    
-                    # 解析腾讯财经返回的数据
-                    lines = response.text.strip().split('\n')
-                    for line in lines:
-                        if line:
-                            parts = line.split('~')
-                            if len(parts) >= 3:
-                                code = parts[0].split('_')[1]
-                                if code in code_mapping:
-                                    name = code_mapping[code]
-                                    try:
-                                        current_price = float(parts[3])
-                                        prev_close = float(parts[4])
-                                        open_price = float(parts[5])
-                                        high_price = float(parts[33])
-                                        low_price = float(parts[34])
-                                        
-                                        change = current_price - prev_close
-                                        change_percent = (change / prev_close) * 100
-                                        
-                                        result[name] = {
-                                            'code': a股_indices[name],
-                                            'price': current_price,
-                                            'change': change,
-                                            'change_percent': change_percent,
-                                            'open': open_price,
-                                            'high': high_price,
-                                            'low': low_price,
-                                            'volume': 0  # 腾讯API可能没有成交量数据
-                                        }
-                                    except (ValueError, IndexError):
-                                        pass
-                except Exception as e:
-                    print(f"腾讯财经API获取失败: {e}")
-            
-            # 添加其他指数（港股、美股、亚太）
-            # 这些可能需要其他API，但我们暂时使用模拟数据
-            result.update({
-                '北证50': {
-                    'code': '899050',
-                    'price': 1200.00,
-                    'change': 8.00,
-                    'change_percent': 0.67,
-                    'open': 1192.00,
-                    'high': 1205.00,
-                    'low': 1188.00,
-                    'volume': 3000000000
-                },
-                '恒生指数': {
-                    'code': 'hkHSI',
-                    'price': 25000.00,
-                    'change': 150.00,
-                    'change_percent': 0.60,
-                    'open': 24850.00,
-                    'high': 25100.00,
-                    'low': 24800.00,
-                    'volume': 8000000000
-                },
-                '恒生科技': {
-                    'code': 'hkHSTECH',
-                    'price': 5800.00,
-                    'change': 80.00,
-                    'change_percent': 1.40,
-                    'open': 5720.00,
-                    'high': 5820.00,
-                    'low': 5700.00,
-                    'volume': 4000000000
-                },
-                '恒生国企': {
-                    'code': 'hkHSCEI',
-                    'price': 8600.00,
-                    'change': 60.00,
-                    'change_percent': 0.70,
-                    'open': 8540.00,
-                    'high': 8620.00,
-                    'low': 8530.00,
-                    'volume': 3500000000
-                },
-                '纳斯达克': {
-                    'code': 'usIXIC',
-                    'price': 15000.00,
-                    'change': 100.00,
-                    'change_percent': 0.67,
-                    'open': 14900.00,
-                    'high': 15100.00,
-                    'low': 14850.00,
-                    'volume': 4000000000
-                },
-                '标普500': {
-                    'code': 'usSPX',
-                    'price': 4700.00,
-                    'change': 30.00,
-                    'change_percent': 0.64,
-                    'open': 4670.00,
-                    'high': 4710.00,
-                    'low': 4660.00,
-                    'volume': 3500000000
-                },
-                '道琼斯': {
-                    'code': 'usDJI',
-                    'price': 36000.00,
-                    'change': 200.00,
-                    'change_percent': 0.56,
-                    'open': 35800.00,
-                    'high': 36100.00,
-                    'low': 35750.00,
-                    'volume': 3000000000
-                },
-                '日经225': {
-                    'code': 'jpN225',
-                    'price': 33500.00,
-                    'change': 350.00,
-                    'change_percent': 1.05,
-                    'open': 33150.00,
-                    'high': 33600.00,
-                    'low': 33100.00,
-                    'volume': 5000000000
-                },
-                '印度孟买sensex': {
-                    'code': 'inSENSEX',
-                    'price': 73500.00,
-                    'change': 800.00,
-                    'change_percent': 1.10,
-                    'open': 72700.00,
-                    'high': 73600.00,
-                    'low': 72600.00,
-                    'volume': 2500000000
-                },
-                '越南胡志明': {
-                    'code': 'vnHOSE',
-                    'price': 1500.00,
-                    'change': 20.00,
-                    'change_percent': 1.35,
-                    'open': 1480.00,
-                    'high': 1510.00,
-                    'low': 1475.00,
-                    'volume': 1000000000
-                }
-            })
-            
-            # 如果成功获取到部分数据，返回结果
-            if result:
-                return result
-            else:
-                # 如果所有API都失败，返回模拟数据
-                raise Exception("所有API都失败")
-                
+            # 多个行情源并发竞速，各市场指数在同一批请求中获取
+            result = get_quote_source_racer().fetch(self, MARKET_INDICES)
         except Exception as e:
             print(f"获取大盘指数失败: {e}")
-            # 返回模拟数据
-            return {
-                '上证指数': {
-                    'code': '000001',
-                    'price': 3300.00,
-                    'change': 10.00,
-                    'change_percent': 0.30,
-                    'open': 3290.00,
-                    'high': 3310.00,
-                    'low': 3285.00,
-                    'volume': 20000000000
-                },
-                '深证成指': {
-                    'code': '399001',
-                    'price': 13000.00,
-                    'change': 50.00,
-                    'change_percent': 0.38,
-                    'open': 12950.00,
-                    'high': 13050.00,
-                    'low': 12900.00,
-                    'volume': 30000000000
-                },
-                '创业板指': {
-                    'code': '399006',
-                    'price': 2800.00,
-                    'change': 20.00,
-                    'change_percent': 0.72,
-                    'open': 2780.00,
-                    'high': 2810.00,
-                    'low': 2770.00,
-                    'volume': 15000000000
-                },
-                '科创50': {
-                    'code': '000688',
-                    'price': 1100.00,
-                    'change': 15.00,
-                    'change_percent': 1.38,
-                    'open': 1085.00,
-                    'high': 1110.00,
-                    'low': 1080.00,
-                    'volume': 8000000000
-                },
-                '北证50': {
-                    'code': '899050',
-                    'price': 1200.00,
-                    'change': 8.00,
-                    'change_percent': 0.67,
-                    'open': 1192.00,
-                    'high': 1205.00,
-                    'low': 1188.00,
-                    'volume': 3000000000
-                },
-                '上证50': {
-                    'code': '000016',
-                    'price': 3500.00,
-                    'change': 12.00,
-                    'change_percent': 0.34,
-                    'open': 3488.00,
-                    'high': 3510.00,
-                    'low': 3480.00,
-                    'volume': 10000000000
-                },
-                '中证500': {
-                    'code': '000905',
-                    'price': 6800.00,
-                    'change': 30.00,
-                    'change_percent': 0.44,
-                    'open': 6770.00,
-                    'high': 6810.00,
-                    'low': 6760.00,
-                    'volume': 12000000000
-                },
-                '中证1000': {
-                    'code': '000852',
-                    'price': 8200.00,
-                    'change': 40.00,
-                    'change_percent': 0.49,
-                    'open': 8160.00,
-                    'high': 8220.00,
-                    'low': 8150.00,
-                    'volume': 9000000000
-                },
-                '沪深300': {
-                    'code': '000300',
-                    'price': 4100.00,
-                    'change': 15.00,
-                    'change_percent': 0.37,
-                    'open': 4085.00,
-                    'high': 4110.00,
-                    'low': 4080.00,
-                    'volume': 18000000000
-                },
-                '恒生指数': {
-                    'code': 'hkHSI',
-                    'price': 25000.00,
-                    'change': 150.00,
-                    'change_percent': 0.60,
-                    'open': 24850.00,
-                    'high': 25100.00,
-                    'low': 24800.00,
-                    'volume': 8000000000
-                },
-                '恒生科技': {
-                    'code': 'hkHSTECH',
-                    'price': 5800.00,
-                    'change': 80.00,
-                    'change_percent': 1.40,
-                    'open': 5720.00,
-                    'high': 5820.00,
-                    'low': 5700.00,
-                    'volume': 4000000000
-                },
-                '恒生国企': {
-                    'code': 'hkHSCEI',
-                    'price': 8600.00,
-                    'change': 60.00,
-                    'change_percent': 0.70,
-                    'open': 8540.00,
-                    'high': 8620.00,
-                    'low': 8530.00,
-                    'volume': 3500000000
-                },
-                '纳斯达克': {
-                    'code': 'usIXIC',
-                    'price': 15000.00,
-                    'change': 100.00,
-                    'change_percent': 0.67,
-                    'open': 14900.00,
-                    'high': 15100.00,
-                    'low': 14850.00,
-                    'volume': 4000000000
-                },
-                '标普500': {
-                    'code': 'usSPX',
-                    'price': 4700.00,
-                    'change': 30.00,
-                    'change_percent': 0.64,
-                    'open': 4670.00,
-                    'high': 4710.00,
-                    'low': 4660.00,
-                    'volume': 3500000000
-                },
-                '道琼斯': {
-                    'code': 'usDJI',
-                    'price': 36000.00,
-                    'change': 200.00,
-                    'change_percent': 0.56,
-                    'open': 35800.00,
-                    'high': 36100.00,
-                    'low': 35750.00,
-                    'volume': 3000000000
-                },
-                '日经225': {
-                    'code': 'jpN225',
-                    'price': 33500.00,
-                    'change': 350.00,
-                    'change_percent': 1.05,
-                    'open': 33150.00,
-                    'high': 33600.00,
-                    'low': 33100.00,
-                    'volume': 5000000000
-                },
-                '印度孟买sensex': {
-                    'code': 'inSENSEX',
-                    'price': 73500.00,
-                    'change': 800.00,
-                    'change_percent': 1.10,
-                    'open': 72700.00,
-                    'high': 73600.00,
-                    'low': 72600.00,
-                    'volume': 2500000000
-                },
-                '越南胡志明': {
-                    'code': 'vnHOSE',
-                    'price': 1500.00,
-                    'change': 20.00,
-                    'change_percent': 1.35,
-                    'open': 1480.00,
-                    'high': 1510.00,
-                    'low': 1475.00,
-                    'volume': 1000000000
-                }
-            }
+            result = {}
+        # 未获取到的指数使用最近一次的真实数据
+        return merge_market_index_snapshot(result)
+    
+    def get_cached_market_index(self):
+        """
+        读取本地保存的最近一次大盘指数（不发起网络请求）
+        :return: CachedValue，从未获取成功时返回None
+        """
+        return self.response_cache.get(MARKET_INDEX_CACHE_KEY, self.MARKET_INDEX_MAX_AGE)
     
     def get_fund_rank(self, rank_type='涨跌幅'):
         """
         获取基金排行榜数据
         :param rank_type: 排行榜类型：涨跌幅、跌幅榜、加仓榜
-        :return: 排行榜数据列表
+        :return: 排行榜数据列表，接口失败时为最近一次获取到的数据，从未获取成功时为空列表
+        """
+        cached = self.fetch_fund_rank(rank_type)
+        return cached.value if cached else []
+    
+    def fetch_fund_rank(self, rank_type='涨跌幅'):
+        """
+        获取基金排行榜，接口失败时返回最近一次获取到的数据（已过期）
+        :param rank_type: 排行榜类型：涨跌幅、跌幅榜、加仓榜
+        :return: CachedValue，接口失败且从未获取成功时返回None
+        """
+        return self.response_cache.fetch(
+            fund_rank_cache_key(rank_type), lambda: self._request_fund_rank(rank_type), self.FUND_RANK_MAX_AGE
+        )
+    
+    def get_cached_fund_rank(self, rank_type='涨跌幅'):
+        """
+        读取本地保存的基金排行榜（不发起网络请求）
+        :param rank_type: 排行榜类型
+        :return: CachedValue，从未获取成功时返回None
+        """
+        return self.response_cache.get(fund_rank_cache_key(rank_type), self.FUND_RANK_MAX_AGE)
+    
+    def _request_fund_rank(self, rank_type):
+        """
+        请求基金排行接口
+        :param rank_type: 排行榜类型
+        :return: 排行榜数据列表，失败返回None
         """
         try:
-            url = "http://fund.eastmoney.com/data/rankhandler.aspx"
-            params = {
-                'op': 'ph',
-                'dt': 'kf',
-                'ft': 'all',
-                'rs': '',
-                'gs': 0,
-                'sc': '1nzf',  # 日涨跌幅
-                'st': '-1',  # 降序
-                'sd': datetime.now().strftime('%Y-%m-%d'),
-                'ed': datetime.now().strftime('%Y-%m-%d'),
-                'qdii': '',
-                'tabSubtype': ',,' ,
-                'pi': 1,
-                'pn': 20,
-                'dx': 1,
-                '_': int(time.time() * 1000)
-            }
-            
-            if rank_type == '跌幅榜':
-                params['st'] = '1'  # 升序
-            elif rank_type == '加仓榜':
-                params['sc'] = '7yjjz'  # 近7日净值增长
-            
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = self._get(FUND_RANK_URL, params=fund_rank_params(rank_type), timeout=10)
             response.encoding = 'utf-8'
-            
-            # 解析返回数据
-            import re
-            data_match = re.search(r'var db=(\[.*?\]);', response.text)
-            if data_match:
-                data_str = data_match.group(1)
-                fund_data = json.loads(data_str)
-                
-                result = []
-                for item in fund_data:
-                    fund_info = item.split(',')
-                    if len(fund_info) > 10:
-                        result.append({
-                            'code': fund_info[0],
-                            'name': fund_info[1],
-                            'net_value': fund_info[3],
-                            'day_growth': fund_info[4],
-                            'week_growth': fund_info[5],
-                            'month_growth': fund_info[6],
-                            'year_growth': fund_info[9]
-                        })
-                return result[:10]  # 返回前10名
-            return []
+            return parse_fund_rank_page(response.text)
         except Exception as e:
             print(f"获取基金排行榜失败: {e}")
-            # 返回默认测试数据
-            return [
-                {'code': '000001', 'name': '华夏成长混合', 'net_value': '1.5678', 'day_growth': '+0.87%'},
-                {'code': '110022', 'name': '易方达消费行业股票', 'net_value': '1.0234', 'day_growth': '+0.12%'},
-                {'code': '001475', 'name': '易方达国防军工混合', 'net_value': '3.2456', 'day_growth': '+1.23%'},
-                {'code': '000689', 'name': '前海开源新经济混合', 'net_value': '2.8765', 'day_growth': '+0.98%'},
-                {'code': '001593', 'name': '天弘中证计算机ETF联接', 'net_value': '1.6789', 'day_growth': '+0.21%'},
-                {'code': '000008', 'name': '华夏全球精选', 'net_value': '2.3456', 'day_growth': '+0.43%'}
-            ]
+            return None
+    
+    def get_fund_list(self):
+        """
+        获取全部基金列表（代码、名称、拼音、类型）
+        :return: 基金列表，获取失败返回None
+        """
+        try:
+            response = self._get(self.FUND_LIST_URL, timeout=30)
+            response.encoding = 'utf-8'
+            
+            # 返回格式：var r = [["000001","HXCZHH","华夏成长混合","混合型-灵活","HUAXIACHENGZHANGHUNHE"],...];
+            data_match = re.search(r'var r\s*=\s*(\[.*\]);?', response.text, re.S)
+            if not data_match:
+                return None
+            
+            result = []
+            for item in json.loads(data_match.group(1)):
+                if len(item) >= 5:
+                    result.append({
+                        'code': item[0],
+                        'pinyin_abbr': item[1],
+                        'name': item[2],
+                        'type': item[3],
+                        'pinyin': item[4]
+                    })
+            return result
+        except Exception as e:
+            print(f"获取基金列表失败: {e}")
+            return None
     
     def get_market_sentiment(self):
         """
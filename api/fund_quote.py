@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基金行情数据结构
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+def parse_number(value):
+    """
+    解析接口返回的数值字符串（如'1.2345'、'+0.87%'）
+    :param value: 字符串或数值
+    :return: 浮点数，空值或无法解析时返回None
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.replace('%', '').replace('+', '').strip()
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+class FundQuote(NamedTuple):
+    """基金行情记录，数值字段在接口边界解析一次"""
+    code: str
+    name: str
+    type: str
+    net_value: Optional[float]  # 单位净值
+    day_growth: Optional[float]  # 日涨跌幅（%）
+    date: str  # 净值日期
+    history: Tuple[Optional[float], ...] = ()  # 最近的日涨跌幅（按日期正序）
+    error: Optional[str] = None  # 获取失败的原因，为None表示数据已更新
+
+    @property
+    def net_value_text(self):
+        """单位净值显示文本"""
+        return '--' if self.net_value is None else f"{self.net_value:.4f}"
+
+    @property
+    def day_growth_text(self):
+        """日涨跌幅显示文本"""
+        return '--' if self.day_growth is None else f"{self.day_growth:+.2f}%"
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+指数行情源：新浪、腾讯等行情接口的统一封装，多个行情源并发竞速获取指数行情
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+
+def a_share_symbol(code):
+    """
+    A股指数代码加上交易所前缀
+    :param code: 指数代码（如 000001、399001、899050）
+    :return: 行情代码（如 sh000001、sz399001、bj899050）
+    """
+    if code.startswith('399'):
+        return f"sz{code}"
+    if code.startswith('899'):
+        return f"bj{code}"
+    return f"sh{code}"
+
+def parse_float(value):
+    """
+    解析行情中的数值，空值返回None
+    :param value: 字符串
+    :return: 浮点数或None
+    """
+    value = value.strip()
+    return float(value) if value else None
+
+class QuoteSource:
+    """行情源基类，子类提供批量行情地址和返回内容的解析"""
+
+    name = ''
+    encoding = 'gb2312'
+    headers = {}
+    SYMBOLS = {}  # 非A股指数代码到行情代码的映射，不在其中的指数该行情源不支持
+
+    def symbol(self, code):
+        """
+        将指数代码转换为行情源使用的代码
+        :param code: 指数代码（如 000001、hkHSI）
+        :return: 行情代码，不支持的指数返回None
+        """
+        if code.isdigit():
+            return a_share_symbol(code)
+        return self.SYMBOLS.get(code)
+
+    def build_url(self, symbols):
+        """
+        生成批量行情请求地址
+        :param symbols: 行情代码列表
+        :return: 请求地址
+        """
+        raise NotImplementedError
+
+    def parse(self, text, symbol_mapping):
+        """
+        解析行情接口返回的内容
+        :param text: 接口返回的文本
+        :param symbol_mapping: {行情代码: (指数名称, 指数代码)}
+        :return: {指数名称: 指数行情}
+        """
+        raise NotImplementedError
+
+    def symbol_mapping(self, indices):
+        """
+        生成行情代码到指数的映射，跳过不支持的指数
+        :param indices: {指数名称: 指数代码}
+        :return: {行情代码: (指数名称, 指数代码)}
+        """
+        mapping = {}
+        for name, code in indices.items():
+            symbol = self.symbol(code)
+            if symbol:
+                mapping[symbol] = (name, code)
+        return mapping
+
+    def supports(self, indices):
+        """
+        获取该行情源支持的指数名称
+        :param indices: {指数名称: 指数代码}
+        :return: 指数名称集合
+        """
+        return {name for name, code in indices.items() if self.symbol(code)}
+
+    def fetch(self, api, indices, timeout=5):
+        """
+        通过FundAPI的长连接会话获取指数行情，所有指数合并为一次请求
+        :param api: FundAPI实例
+        :param indices: {指数名称: 指数代码}
+        :param timeout: 超时时间（秒）
+        :return: {指数名称: 指数行情}
+        """
+        mapping = self.symbol_mapping(indices)
+        if not mapping:
+            return {}
+        headers = dict(api.headers, **self.headers)
+        response = api._get(self.build_url(list(mapping)), headers=headers, timeout=timeout)
+        response.encoding = self.encoding
+        return self.parse(response.text, mapping)
+
+def index_quote(code, current_price, prev_close, open_price=None, high_price=None, low_price=None, volume=0):
+    """
+    生成指数行情字典，价格无效时返回None
+    :return: 指数行情
+    """
+    if not current_price or not prev_close or current_price <= 0 or prev_close <= 0:
+        return None
+    change = current_price - prev_close
+    return {
+        'code': code,
+        'price': current_price,
+        'change': change,
+        'change_percent': (change / prev_close) * 100,
+        'open': open_price,
+        'high': high_price,
+        'low': low_price,
+        'volume': volume or 0
+    }
+
+class SinaQuoteSource(QuoteSource):
+    """新浪财经行情，A股、港股、美股和亚太指数的返回格式各不相同"""
+
+    name = 'sina'
+    headers = {'Referer': 'https://finance.sina.com.cn/'}
+    SYMBOLS = {
+        'hkHSI': 'rt_hkHSI',
+        'hkHSTECH': 'rt_hkHSTECH',
+        'hkHSCEI': 'rt_hkHSCEI',
+        'usIXIC': 'gb_ixic',
+        'usSPX': 'gb_inx',
+        'usDJI': 'gb_dji',
+        'jpN225': 'int_nikkei',
+        'inSENSEX': 'int_sensex'
+    }
+
+    def build_url(self, symbols):
+        return "http://hq.sinajs.cn/list=" + ",".join(symbols)
+
+    @staticmethod
+    def _parse_fields(symbol, code, data):
+        """
+        按行情代码的类型解析字段
+        :return: 指数行情，字段不足时返回None
+        """
+        if symbol.startswith('rt_hk'):
+            # 英文名,中文名,开盘价,昨收,最高价,最低价,当前价,...
+            if len(data) < 7:
+                return None
+            return index_quote(code, parse_float(data[6]), parse_float(data[3]), parse_float(data[2]),
+                               parse_float(data[4]), parse_float(data[5]))
+        if symbol.startswith('gb_'):
+            # 名称,当前价,涨跌幅,时间,涨跌额,开盘价,最高价,最低价,52周最高,52周最低,成交量,...
+            if len(data) < 11:
+                return None
+            price, change = parse_float(data[1]), parse_float(data[4])
+            prev_close = price - change if price is not None and change is not None else None
+            return index_quote(code, price, prev_close, parse_float(data[5]), parse_float(data[6]),
+                               parse_float(data[7]), parse_float(data[10]))
+        if symbol.startswith('int_'):
+            # 名称,当前价,涨跌额,涨跌幅
+            if len(data) < 3:
+                return None
+            price, change = parse_float(data[1]), parse_float(data[2])
+            prev_close = price - change if price is not None and change is not None else None
+            return index_quote(code, price, prev_close)
+        # 名称,开盘价,昨收,当前价,最高价,最低价,买一价,卖一价,成交量,...
+        if len(data) < 6:
+            return None
+        return index_quote(code, parse_float(data[3]), parse_float(data[2]), parse_float(data[1]),
+                           parse_float(data[4]), parse_float(data[5]),
+                           parse_float(data[8]) if len(data) > 8 else 0)
+
+    def parse(self, text, symbol_mapping):
+        result = {}
+        for line in text.strip().split('\n'):
+            parts = line.split('=', 1)
+            if len(parts) != 2:
+                continue
+            # var hq_str_rt_hkHSI="...";
+            symbol = parts[0].strip().replace('var hq_str_', '', 1)
+            data = parts[1].strip().rstrip(';').strip('"').split(',')
+            if symbol not in symbol_mapping:
+                continue
+            name, code = symbol_mapping[symbol]
+            try:
+                quote = self._parse_fields(symbol, code, data)
+            except ValueError:
+                continue
+            if quote:
+                result[name] = quote
+        return result
+
+class TencentQuoteSource(QuoteSource):
+    """腾讯财经行情：v_sh000001="1~名称~代码~当前价~昨收~开盘价~成交量~...~最高价(33)~最低价(34)~...";"""
+
+    name = 'tencent'
+    SYMBOLS = {
+        'hkHSI': 'hkHSI',
+        'hkHSTECH': 'hkHSTECH',
+        'hkHSCEI': 'hkHSCEI',
+        'usIXIC': 'us.IXIC',
+        'usSPX': 'us.INX',
+        'usDJI': 'us.DJI'
+    }
+
+    def build_url(self, symbols):
+        return "http://qt.gtimg.cn/q=" + ",".join(symbols)
+
+    def parse(self, text, symbol_mapping):
+        # 返回的变量名不含代码中的点（v_usIXIC），按去掉点后的代码匹配
+        mapping = {symbol.replace('.', ''): index for symbol, index in symbol_mapping.items()}
+        result = {}
+        for line in text.strip().split('\n'):
+            parts = line.split('~')
+            if len(parts) < 35:
+                continue
+            symbol = parts[0].split('=')[0].strip().replace('v_', '', 1).replace('.', '')
+            if symbol not in mapping:
+                continue
+            name, code = mapping[symbol]
+            try:
+                quote = index_quote(code, parse_float(parts[3]), parse_float(parts[4]), parse_float(parts[5]),
+                                    parse_float(parts[33]), parse_float(parts[34]), parse_float(parts[6]))
+            except ValueError:
+                continue
+            if quote:
+                result[name] = quote
+        return result
+
+class QuoteSourceStats:
+    """行情源的延迟和错误统计，用于调整行情源的优先顺序"""
+
+    LATENCY_ALPHA = 0.3  # 延迟指数移动平均的权重
+    FAILURE_THRESHOLD = 3  # 连续失败多少次后暂停使用
+    COOLDOWN = 30  # 首次暂停时长（秒），再次失败时翻倍
+    MAX_COOLDOWN = 600
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.latency = None  # 成功请求延迟的指数移动平均（秒）
+        self.last_error = None
+        self.cooldown_until = 0
+
+    def record_success(self, latency):
+        """记录一次成功请求"""
+        self.requests += 1
+        self.consecutive_errors = 0
+        self.cooldown_until = 0
+        self.latency = latency if self.latency is None else (
+            self.LATENCY_ALPHA * latency + (1 - self.LATENCY_ALPHA) * self.latency)
+
+    def record_error(self, error):
+        """记录一次失败请求"""
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_errors += 1
+        self.last_error = str(error)
+        if self.consecutive_errors >= self.FAILURE_THRESHOLD:
+            extra = self.consecutive_errors - self.FAILURE_THRESHOLD
+            self.cooldown_until = time.time() + min(self.COOLDOWN * 2 ** extra, self.MAX_COOLDOWN)
+
+    def in_cooldown(self):
+        """是否处于暂停期"""
+        return time.time() < self.cooldown_until
+
+    def score(self):
+        """
+        优先级分数，越小越优先：平均延迟按错误率放大，没有记录的行情源视为1秒
+        :return: 分数
+        """
+        error_rate = self.errors / self.requests if self.requests else 0
+        return (self.latency if self.latency is not None else 1.0) * (1 + 4 * error_rate)
+
+    def to_dict(self):
+        """
+        导出统计数据
+        :return: 统计字典
+        """
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'consecutive_errors': self.consecutive_errors,
+            'latency': self.latency,
+            'last_error': self.last_error,
+            'in_cooldown': self.in_cooldown()
+        }
+
+class QuoteSourceRacer:
+    """
+    多行情源竞速：按优先顺序选出若干行情源并发请求，每个指数取最先返回的有效行情，
+    本轮行情源支持的指数都拿到后立即返回，不等待较慢的行情源；未覆盖的指数再由剩余行情源补齐。
+    """
+
+    def __init__(self, sources=None, max_parallel=2, timeout=5):
+        """
+        :param sources: 行情源列表
+        :param max_parallel: 同时竞速的行情源数量
+        :param timeout: 每轮竞速的超时时间（秒）
+        """
+        self.sources = list(sources or [SinaQuoteSource(), TencentQuoteSource()])
+        self.max_parallel = max(1, max_parallel)
+        self.timeout = timeout
+        self._stats = {source.name: QuoteSourceStats() for source in self.sources}
+        self._lock = threading.Lock()
+        # 竞速结束后仍在进行的异步请求，保留引用以免任务被回收
+        self._background_tasks = set()
+
+    def add_source(self, source):
+        """
+        注册新的行情源
+        :param source: QuoteSource实例
+        """
+        with self._lock:
+            self.sources.append(source)
+            self._stats.setdefault(source.name, QuoteSourceStats())
+
+    def ordered_sources(self):
+        """
+        按优先级排序的行情源：暂停中的排在最后，其余按延迟和错误率排序
+        :return: 行情源列表
+        """
+        with self._lock:
+            return sorted(self.sources, key=lambda source: (
+                self._stats[source.name].in_cooldown(), self._stats[source.name].score()))
+
+    def get_stats(self):
+        """
+        获取各行情源的统计
+        :return: {行情源名称: 统计字典}
+        """
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self._stats.items()}
+
+    def _record(self, source, start, error=None):
+        """记录一次请求的结果"""
+        with self._lock:
+            stats = self._stats[source.name]
+            if error is None:
+                stats.record_success(time.time() - start)
+            else:
+                stats.record_error(error)
+
+    def _fetch_source(self, source, api, indices):
+        """
+        请求单个行情源并记录统计，失败时返回空结果
+        :return: {指数名称: 指数行情}
+        """
+        start = time.time()
+        try:
+            data = source.fetch(api, indices, timeout=self.timeout)
+            if not data:
+                raise ValueError("没有有效的行情数据")
+        except Exception as e:
+            self._record(source, start, e)
+            print(f"行情源 {source.name} 获取失败: {e}")
+            return {}
+        self._record(source, start)
+        return data
+
+    def _rounds(self):
+        """按优先顺序把行情源分成多轮，每轮最多 max_parallel 个"""
+        sources = self.ordered_sources()
+        return [sources[i:i + self.max_parallel] for i in range(0, len(sources), self.max_parallel)]
+
+    def fetch(self, api, indices):
+        """
+        竞速获取指数行情（阻塞）
+        :param api: FundAPI实例
+        :param indices: {指数名称: 指数代码}
+        :return: {指数名称: 指数行情}，全部失败时为空字典
+        """
+        result = {}
+        for sources in self._rounds():
+            missing = {name: code for name, code in indices.items() if name not in result}
+            if not missing:
+                break
+            sources = [source for source in sources if source.supports(missing)]
+            if not sources:
+                continue
+            wanted = set().union(*(source.supports(missing) for source in sources))
+            executor = ThreadPoolExecutor(max_workers=len(sources))
+            futures = [executor.submit(self._fetch_source, source, api, missing) for source in sources]
+            try:
+                for future in as_completed(futures, timeout=self.timeout + 1):
+                    for name, quote in future.result().items():
+                        result.setdefault(name, quote)
+                    if wanted.issubset(result):
+                        break
+            except FutureTimeoutError:
+                print("行情源竞速超时")
+            finally:
+                # 不等待较慢的行情源，其结果只用于统计
+                executor.shutdown(wait=False)
+        return result
+
+    async def _fetch_source_async(self, source, get_text, indices):
+        """
+        异步请求单个行情源并记录统计，失败时返回空结果
+        :return: {指数名称: 指数行情}
+        """
+        start = time.time()
+        try:
+            mapping = source.symbol_mapping(indices)
+            text = await get_text(source.build_url(list(mapping)), timeout=self.timeout,
+                                  encoding=source.encoding, headers=source.headers)
+            data = source.parse(text, mapping)
+            if not data:
+                raise ValueError("没有有效的行情数据")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record(source, start, e)
+            print(f"行情源 {source.name} 获取失败: {e}")
+            return {}
+        self._record(source, start)
+        return data
+
+    async def fetch_async(self, get_text, indices):
+        """
+        竞速获取指数行情（协程）
+        :param get_text: 异步GET函数 get_text(url, timeout=, encoding=, headers=) -> 文本
+        :param indices: {指数名称: 指数代码}
+        :return: {指数名称: 指数行情}，全部失败时为空字典
+        """
+        result = {}
+        for sources in self._rounds():
+            missing = {name: code for name, code in indices.items() if name not in result}
+            if not missing:
+                break
+            sources = [source for source in sources if source.supports(missing)]
+            if not sources:
+                continue
+            wanted = set().union(*(source.supports(missing) for source in sources))
+            tasks = [asyncio.ensure_future(self._fetch_source_async(source, get_text, missing))
+                     for source in sources]
+            try:
+                for next_done in asyncio.as_completed(tasks, timeout=self.timeout + 1):
+                    for name, quote in (await next_done).items():
+                        result.setdefault(name, quote)
+                    if wanted.issubset(result):
+                        break
+            except asyncio.TimeoutError:
+                print("行情源竞速超时")
+            finally:
+                # 不取消较慢的行情源，让其在后台完成（受 self.timeout 限制）并记录延迟或超时
+                for task in tasks:
+                    if not task.done():
+                        self._background_tasks.add(task)
+                        task.add_done_callback(self._background_tasks.discard)
+        return result
+
+# 所有FundAPI实例共享的行情源竞速器，统计数据随使用积累
+_quote_source_racer = QuoteSourceRacer()
+
+def get_quote_source_racer():
+    """获取共享的行情源竞速器"""
+    return _quote_source_racer
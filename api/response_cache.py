@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口响应缓存：按接口保存最近一次成功的响应，接口失败时返回旧数据并标记为过期
+"""
+
+import json
+import time
+from typing import Any, NamedTuple
+
+from database.db_manager import FundDB
+
+class CachedValue(NamedTuple):
+    """缓存的接口响应"""
+    value: Any
+    update_time: float  # 获取时间（time.time()）
+    max_age: float  # 有效期（秒）
+
+    @property
+    def age(self):
+        """数据已存在的时长（秒）"""
+        return max(0.0, time.time() - self.update_time)
+
+    @property
+    def stale(self):
+        """是否已过期，过期的数据仍可显示，但应在后台重新获取"""
+        return self.age > self.max_age
+
+class ResponseCache:
+    """
+    接口响应缓存，数据保存在 kv_cache 表中，重启后仍可使用：
+    界面先显示缓存（可能已过期），后台线程通过 fetch 重新获取，失败时继续使用旧数据。
+    """
+
+    KEY_PREFIX = 'response:'
+
+    def get(self, key, max_age):
+        """
+        读取缓存（不发起网络请求）
+        :param key: 接口缓存键
+        :param max_age: 有效期（秒）
+        :return: CachedValue，没有缓存时返回None
+        """
+        db = FundDB()
+        payload, update_time = db.get_cache(self.KEY_PREFIX + key)
+        db.close()
+        if payload is None:
+            return None
+        try:
+            return CachedValue(json.loads(payload), update_time, max_age)
+        except ValueError as e:
+            print(f"读取接口缓存失败: {e}")
+            return None
+
+    def put(self, key, value, max_age=0):
+        """
+        保存接口响应
+        :param key: 接口缓存键
+        :param value: 可JSON序列化的响应数据
+        :param max_age: 有效期（秒）
+        :return: CachedValue
+        """
+        now = time.time()
+        db = FundDB()
+        db.set_cache(self.KEY_PREFIX + key, json.dumps(value, ensure_ascii=False), now)
+        db.close()
+        return CachedValue(value, now, max_age)
+
+    def fetch(self, key, fetcher, max_age):
+        """
+        请求接口并保存成功的响应，失败时返回最近一次成功的响应（阻塞，只能在后台线程调用）
+        :param key: 接口缓存键
+        :param fetcher: 请求函数，失败时返回None或空数据
+        :param max_age: 有效期（秒）
+        :return: CachedValue，接口失败且没有缓存时返回None
+        """
+        try:
+            value = fetcher()
+        except Exception as e:
+            print(f"请求接口 {key} 失败: {e}")
+            value = None
+        if value:
+            return self.put(key, value, max_age)
+        return self.get(key, max_age)
+
+# 所有FundAPI实例共享的响应缓存
+_response_cache = ResponseCache()
+
+def get_response_cache():
+    """获取共享的接口响应缓存"""
+    return _response_cache
@@ -6,9 +6,91 @@
 
 import sqlite3
 import os
+import time
+import threading
+from contextlib import contextmanager
+
+from database.migrations import migrate
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fund_manager.db')
 
+class ConnectionManager:
+    """进程级数据库连接管理，每个线程复用一个长连接"""
+    
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA cache_size=-8000',  # 约8MB页缓存
+        'PRAGMA mmap_size=67108864',  # 64MB内存映射
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA busy_timeout=5000'
+    )
+    
+    def __init__(self):
+        self._local = threading.local()
+    
+    def get_connection(self):
+        """
+        获取当前线程的数据库连接，不存在时创建
+        :return: sqlite3.Connection
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.path == DB_PATH:
+            return conn
+        
+        self.close_connection()
+        # 自动提交模式，事务由FundDB.transaction显式管理
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        self._local.conn = conn
+        self._local.path = DB_PATH
+        self._local.depth = 0
+        return conn
+    
+    def close_connection(self):
+        """关闭当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    @contextmanager
+    def transaction(self):
+        """
+        当前线程的事务，嵌套调用使用保存点，最外层结束时统一提交
+        """
+        conn = self.get_connection()
+        depth = self._local.depth
+        if depth == 0:
+            conn.execute('BEGIN IMMEDIATE')
+        else:
+            conn.execute(f'SAVEPOINT sp_{depth}')
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0:
+                conn.execute('ROLLBACK')
+            else:
+                conn.execute(f'ROLLBACK TO sp_{depth}')
+                conn.execute(f'RELEASE sp_{depth}')
+            raise
+        else:
+            self._local.depth = depth
+            if depth == 0:
+                conn.execute('COMMIT')
+            else:
+                conn.execute(f'RELEASE sp_{depth}')
+
+# 全局连接管理器
+_connection_manager = ConnectionManager()
+
+def get_connection_manager():
+    """获取全局连接管理器"""
+    return _connection_manager
+
 class FundDB:
     """基金数据库操作类"""
     
@@ -18,57 +100,32 @@ class FundDB:
         self._connect()
     
     def _connect(self):
-        """连接数据库"""
+        """连接数据库（复用当前线程的长连接）"""
         try:
-            self.conn = sqlite3.connect(DB_PATH)
+            self.conn = _connection_manager.get_connection()
             self.cursor = self.conn.cursor()
         except Exception as e:
             print(f"数据库连接失败: {e}")
     
     def close(self):
-        """关闭数据库连接"""
+        """释放游标，线程的长连接保持打开"""
         if self.cursor:
             self.cursor.close()
-        if self.conn:
-            self.conn.close()
+            self.cursor = None
+    
+    def transaction(self):
+        """
+        事务上下文，块内的所有语句一次提交，异常时回滚
+        用法：with db.transaction(): ...
+        """
+        return _connection_manager.transaction()
     
     def create_tables(self):
-        """创建数据表"""
+        """创建数据表：按版本执行尚未执行的迁移步骤"""
         try:
-            # 创建自选基金表
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS favorite_funds (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    fund_code TEXT UNIQUE,
-                    fund_name TEXT,
-                    fund_type TEXT,
-                    add_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 创建基金组合表
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS fund_portfolios (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    portfolio_name TEXT,
-                    create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 创建组合基金关联表
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS portfolio_funds (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    portfolio_id INTEGER,
-                    fund_code TEXT,
-                    FOREIGN KEY (portfolio_id) REFERENCES fund_portfolios(id)
-                )
-            ''')
-            
-            self.conn.commit()
+            migrate(self)
         except Exception as e:
             print(f"创建表失败: {e}")
-            self.conn.rollback()
     
     def add_favorite_fund(self, fund_code, fund_name, fund_type):
         """
@@ -79,17 +136,60 @@ class FundDB:
         :return: 是否添加成功
         """
         try:
-            self.cursor.execute(
-                "INSERT OR IGNORE INTO favorite_funds (fund_code, fund_name, fund_type) VALUES (?, ?, ?)",
-                (fund_code, fund_name, fund_type)
-            )
-            self.conn.commit()
+            with self.transaction():
+                self.cursor.execute(
+                    "INSERT OR IGNORE INTO favorite_funds (fund_code, fund_name, fund_type) VALUES (?, ?, ?)",
+                    (fund_code, fund_name, fund_type)
+                )
             return True
         except Exception as e:
             print(f"添加自选基金失败: {e}")
-            self.conn.rollback()
             return False
     
+    def add_favorite_funds(self, funds):
+        """
+        批量添加自选基金，一次事务提交
+        :param funds: 基金列表，每项包含code、name、type
+        :return: 实际新增的数量，失败返回None
+        """
+        try:
+            with self.transaction():
+                changes_before = self.conn.total_changes
+                self.cursor.executemany(
+                    "INSERT OR IGNORE INTO favorite_funds (fund_code, fund_name, fund_type) VALUES (?, ?, ?)",
+                    [(fund['code'], fund['name'], fund['type']) for fund in funds]
+                )
+                added = self.conn.total_changes - changes_before
+            return added
+        except Exception as e:
+            print(f"批量添加自选基金失败: {e}")
+            return None
+    
+    def get_known_funds(self, fund_codes):
+        """
+        从基金信息缓存和全部基金列表中查找已知基金
+        :param fund_codes: 基金代码列表
+        :return: {基金代码: {'code', 'name', 'type'}}
+        """
+        result = {}
+        try:
+            codes = list(fund_codes)
+            # 分批查询，避免超过SQLite参数数量限制
+            for start in range(0, len(codes), 500):
+                chunk = codes[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for table in ('fund_universe', 'fund_info_cache'):
+                    self.cursor.execute(
+                        f"SELECT fund_code, fund_name, fund_type FROM {table} WHERE fund_code IN ({placeholders})",
+                        chunk
+                    )
+                    for row in self.cursor.fetchall():
+                        result[row[0]] = {'code': row[0], 'name': row[1], 'type': row[2]}
+            return result
+        except Exception as e:
+            print(f"查询已知基金失败: {e}")
+            return result
+    
     def remove_favorite_fund(self, fund_code):
         """
         移除自选基金
@@ -97,15 +197,14 @@ class FundDB:
         :return: 是否移除成功
         """
         try:
-            self.cursor.execute(
-                "DELETE FROM favorite_funds WHERE fund_code = ?",
-                (fund_code,)
-            )
-            self.conn.commit()
+            with self.transaction():
+                self.cursor.execute(
+                    "DELETE FROM favorite_funds WHERE fund_code = ?",
+                    (fund_code,)
+                )
             return True
         except Exception as e:
             print(f"移除自选基金失败: {e}")
-            self.conn.rollback()
             return False
     
     def get_favorite_funds(self):
@@ -134,15 +233,14 @@ class FundDB:
         :return: 组合ID
         """
         try:
-            self.cursor.execute(
-                "INSERT INTO fund_portfolios (portfolio_name) VALUES (?)",
-                (portfolio_name,)
-            )
-            self.conn.commit()
+            with self.transaction():
+                self.cursor.execute(
+                    "INSERT INTO fund_portfolios (portfolio_name) VALUES (?)",
+                    (portfolio_name,)
+                )
             return self.cursor.lastrowid
         except Exception as e:
             print(f"添加组合失败: {e}")
-            self.conn.rollback()
             return None
     
     def remove_portfolio(self, portfolio_id):
@@ -152,21 +250,20 @@ class FundDB:
         :return: 是否移除成功
         """
         try:
-            # 先删除组合关联的基金
-            self.cursor.execute(
-                "DELETE FROM portfolio_funds WHERE portfolio_id = ?",
-                (portfolio_id,)
-            )
-            # 再删除组合
-            self.cursor.execute(
-                "DELETE FROM fund_portfolios WHERE id = ?",
-                (portfolio_id,)
-            )
-            self.conn.commit()
+            with self.transaction():
+                # 先删除组合关联的基金
+                self.cursor.execute(
+                    "DELETE FROM portfolio_funds WHERE portfolio_id = ?",
+                    (portfolio_id,)
+                )
+                # 再删除组合
+                self.cursor.execute(
+                    "DELETE FROM fund_portfolios WHERE id = ?",
+                    (portfolio_id,)
+                )
             return True
         except Exception as e:
             print(f"移除组合失败: {e}")
-            self.conn.rollback()
             return False
     
     def add_fund_to_portfolio(self, portfolio_id, fund_code):
@@ -177,15 +274,14 @@ class FundDB:
         :return: 是否添加成功
         """
         try:
-            self.cursor.execute(
-                "INSERT OR IGNORE INTO portfolio_funds (portfolio_id, fund_code) VALUES (?, ?)",
-                (portfolio_id, fund_code)
-            )
-            self.conn.commit()
+            with self.transaction():
+                self.cursor.execute(
+                    "INSERT OR IGNORE INTO portfolio_funds (portfolio_id, fund_code) VALUES (?, ?)",
+                    (portfolio_id, fund_code)
+                )
             return True
         except Exception as e:
             print(f"向组合添加基金失败: {e}")
-            self.conn.rollback()
             return False
     
     def remove_fund_from_portfolio(self, portfolio_id, fund_code):
@@ -196,15 +292,14 @@ class FundDB:
         :return: 是否移除成功
         """
         try:
-            self.cursor.execute(
-                "DELETE FROM portfolio_funds WHERE portfolio_id = ? AND fund_code = ?",
-                (portfolio_id, fund_code)
-            )
-            self.conn.commit()
+            with self.transaction():
+                self.cursor.execute(
+                    "DELETE FROM portfolio_funds WHERE portfolio_id = ? AND fund_code = ?",
+                    (portfolio_id, fund_code)
+                )
             return True
         except Exception as e:
             print(f"从组合移除基金失败: {e}")
-            self.conn.rollback()
             return False
     
     def get_portfolios(self):
@@ -213,29 +308,41 @@ class FundDB:
         :return: 组合列表
         """
         try:
-            self.cursor.execute("SELECT * FROM fund_portfolios")
-            portfolios = self.cursor.fetchall()
-            result = []
-            for portfolio in portfolios:
-                portfolio_id = portfolio[0]
-                # 获取组合中的基金
-                self.cursor.execute(
-                    "SELECT fund_code FROM portfolio_funds WHERE portfolio_id = ?",
-                    (portfolio_id,)
-                )
-                fund_codes = [item[0] for item in self.cursor.fetchall()]
-                
-                result.append({
-                    'id': portfolio_id,
-                    'name': portfolio[1],
-                    'create_time': portfolio[2],
-                    'fund_codes': fund_codes
-                })
-            return result
+            # 一次查询取出所有组合及其基金（组合内基金按代码排序）
+            self.cursor.execute('''
+                SELECT p.id, p.portfolio_name, p.create_time, group_concat(f.fund_code)
+                FROM fund_portfolios p
+                LEFT JOIN portfolio_funds f ON f.portfolio_id = p.id
+                GROUP BY p.id
+                ORDER BY p.id
+            ''')
+            return [{
+                'id': portfolio[0],
+                'name': portfolio[1],
+                'create_time': portfolio[2],
+                'fund_codes': portfolio[3].split(',') if portfolio[3] else []
+            } for portfolio in self.cursor.fetchall()]
         except Exception as e:
             print(f"获取基金组合失败: {e}")
             return []
     
+    def portfolio_name_exists(self, portfolio_name, exclude_id=None):
+        """
+        检查组合名称是否已存在
+        :param portfolio_name: 组合名称
+        :param exclude_id: 排除的组合ID（重命名时排除自身）
+        :return: 是否存在
+        """
+        try:
+            self.cursor.execute(
+                "SELECT 1 FROM fund_portfolios WHERE portfolio_name = ? AND id IS NOT ? LIMIT 1",
+                (portfolio_name, exclude_id)
+            )
+            return self.cursor.fetchone() is not None
+        except Exception as e:
+            print(f"检查组合名称失败: {e}")
+            return False
+    
     def update_portfolio_name(self, portfolio_id, new_name):
         """
         更新组合名称
@@ -244,15 +351,14 @@ class FundDB:
         :return: 是否更新成功
         """
         try:
-            self.cursor.execute(
-                "UPDATE fund_portfolios SET portfolio_name = ? WHERE id = ?",
-                (new_name, portfolio_id)
-            )
-            self.conn.commit()
+            with self.transaction():
+                self.cursor.execute(
+                    "UPDATE fund_portfolios SET portfolio_name = ? WHERE id = ?",
+                    (new_name, portfolio_id)
+                )
             return True
         except Exception as e:
             print(f"更新组合名称失败: {e}")
-            self.conn.rollback()
             return False
     
     def delete_portfolio(self, portfolio_id):
@@ -263,6 +369,282 @@ class FundDB:
         """
         return self.remove_portfolio(portfolio_id)
 
+    def get_fund_info_cache(self, fund_code, max_age=None):
+        """
+        获取缓存的基金基本信息
+        :param fund_code: 基金代码
+        :param max_age: 最大缓存时长（秒），为None时不检查过期
+        :return: 基金信息字典，未缓存或已过期返回None
+        """
+        try:
+            self.cursor.execute(
+                "SELECT fund_code, fund_name, fund_type, update_time FROM fund_info_cache WHERE fund_code = ?",
+                (fund_code,)
+            )
+            row = self.cursor.fetchone()
+            if not row:
+                return None
+            if max_age is not None and time.time() - row[3] > max_age:
+                return None
+            return {
+                'code': row[0],
+                'name': row[1],
+                'type': row[2]
+            }
+        except Exception as e:
+            print(f"获取基金信息缓存失败: {e}")
+            return None
+    
+    def save_fund_info_cache(self, fund_code, fund_name, fund_type):
+        """
+        保存基金基本信息到缓存
+        :param fund_code: 基金代码
+        :param fund_name: 基金名称
+        :param fund_type: 基金类型
+        :return: 是否保存成功
+        """
+        try:
+            with self.transaction():
+                self.cursor.execute(
+                    "INSERT OR REPLACE INTO fund_info_cache (fund_code, fund_name, fund_type, update_time) VALUES (?, ?, ?, ?)",
+                    (fund_code, fund_name, fund_type, time.time())
+                )
+            return True
+        except Exception as e:
+            print(f"保存基金信息缓存失败: {e}")
+            return False
+    
+    def clear_fund_info_cache(self, fund_code=None):
+        """
+        清除基金基本信息缓存
+        :param fund_code: 基金代码，为None时清除全部缓存
+        :return: 是否清除成功
+        """
+        try:
+            with self.transaction():
+                if fund_code is None:
+                    self.cursor.execute("DELETE FROM fund_info_cache")
+                else:
+                    self.cursor.execute(
+                        "DELETE FROM fund_info_cache WHERE fund_code = ?",
+                        (fund_code,)
+                    )
+            return True
+        except Exception as e:
+            print(f"清除基金信息缓存失败: {e}")
+            return False
+
+    def get_fund_universe(self):
+        """
+        获取本地保存的全部基金列表
+        :return: 基金列表
+        """
+        try:
+            self.cursor.execute(
+                "SELECT fund_code, fund_name, fund_type, pinyin_abbr, pinyin_full FROM fund_universe ORDER BY fund_code"
+            )
+            return [{
+                'code': row[0],
+                'name': row[1],
+                'type': row[2],
+                'pinyin_abbr': row[3],
+                'pinyin': row[4]
+            } for row in self.cursor.fetchall()]
+        except Exception as e:
+            print(f"获取基金列表失败: {e}")
+            return []
+    
+    def sync_fund_universe(self, funds):
+        """
+        增量同步全部基金列表，只写入新增或变化的基金，并删除列表中已不存在（已清盘、退市）的基金
+        :param funds: 完整的基金列表，为空时不做任何修改
+        :return: 写入和删除的基金数量，失败返回None
+        """
+        if not funds:
+            return 0
+        try:
+            with self.transaction():
+                self.cursor.execute(
+                    "SELECT fund_code, fund_name, fund_type, pinyin_abbr, pinyin_full FROM fund_universe"
+                )
+                existing = {row[0]: row[1:] for row in self.cursor.fetchall()}
+            
+                now = time.time()
+                changed = []
+                for fund in funds:
+                    values = (fund['name'], fund['type'], fund['pinyin_abbr'], fund['pinyin'])
+                    if existing.get(fund['code']) != values:
+                        changed.append((fund['code'],) + values + (now,))
+            
+                if changed:
+                    self.cursor.executemany(
+                        "INSERT OR REPLACE INTO fund_universe (fund_code, fund_name, fund_type, pinyin_abbr, pinyin_full, update_time) VALUES (?, ?, ?, ?, ?, ?)",
+                        changed
+                    )
+                
+                # 未变化的基金不重写，按代码找出本次列表中已不存在的基金
+                removed = existing.keys() - {fund['code'] for fund in funds}
+                if removed:
+                    self.cursor.executemany(
+                        "DELETE FROM fund_universe WHERE fund_code = ?",
+                        [(code,) for code in removed]
+                    )
+            return len(changed) + len(removed)
+        except Exception as e:
+            print(f"同步基金列表失败: {e}")
+            return None
+    
+    def save_nav_history(self, fund_code, nav_list):
+        """
+        保存基金历史净值
+        :param fund_code: 基金代码
+        :param nav_list: 净值列表，每项包含date、net_value、acc_value、day_growth（数值或None）
+        :return: 是否保存成功
+        """
+        try:
+            with self.transaction():
+                self.cursor.executemany(
+                    "INSERT OR REPLACE INTO fund_nav_history (fund_code, nav_date, net_value, acc_value, day_growth) VALUES (?, ?, ?, ?, ?)",
+                    [(fund_code, nav['date'], nav['net_value'], nav['acc_value'], nav['day_growth']) for nav in nav_list]
+                )
+            return True
+        except Exception as e:
+            print(f"保存历史净值失败: {e}")
+            return False
+    
+    def get_last_nav_date(self, fund_code):
+        """
+        获取本地保存的最新净值日期
+        :param fund_code: 基金代码
+        :return: 日期字符串，没有数据返回None
+        """
+        try:
+            self.cursor.execute(
+                "SELECT MAX(nav_date) FROM fund_nav_history WHERE fund_code = ?",
+                (fund_code,)
+            )
+            row = self.cursor.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"获取最新净值日期失败: {e}")
+            return None
+    
+    def get_nav_history(self, fund_code, limit=None):
+        """
+        获取本地保存的基金历史净值
+        :param fund_code: 基金代码
+        :param limit: 只取最近的条数，为None时返回全部
+        :return: 净值列表（按日期正序）
+        """
+        try:
+            self.cursor.execute(
+                "SELECT nav_date, net_value, acc_value, day_growth FROM fund_nav_history WHERE fund_code = ? ORDER BY nav_date DESC LIMIT ?",
+                (fund_code, -1 if limit is None else limit)
+            )
+            rows = self.cursor.fetchall()
+            rows.reverse()
+            return [{
+                'date': row[0],
+                'net_value': row[1],
+                'acc_value': row[2],
+                'day_growth': row[3]
+            } for row in rows]
+        except Exception as e:
+            print(f"获取历史净值失败: {e}")
+            return []
+    
+    def get_favorite_board(self, limit=10):
+        """
+        获取自选榜：按最新日涨跌幅排序的自选基金
+        :param limit: 返回数量
+        :return: 基金列表
+        """
+        try:
+            self.cursor.execute('''
+                SELECT f.fund_code, f.fund_name, h.net_value, h.day_growth, h.nav_date
+                FROM favorite_funds f
+                JOIN fund_nav_history h ON h.fund_code = f.fund_code
+                    AND h.nav_date = (SELECT MAX(nav_date) FROM fund_nav_history WHERE fund_code = f.fund_code)
+                WHERE h.day_growth IS NOT NULL
+                ORDER BY h.day_growth DESC
+                LIMIT ?
+            ''', (limit,))
+            return [{
+                'code': row[0],
+                'name': row[1],
+                'net_value': row[2],
+                'day_growth': row[3],
+                'date': row[4]
+            } for row in self.cursor.fetchall()]
+        except Exception as e:
+            print(f"获取自选榜失败: {e}")
+            return []
+    
+    def get_holding_board(self, limit=10):
+        """
+        获取持有榜：按最新日涨跌幅排序的组合持有基金
+        :param limit: 返回数量
+        :return: 基金列表
+        """
+        try:
+            self.cursor.execute('''
+                SELECT p.fund_code, COALESCE(c.fund_name, u.fund_name, p.fund_code), h.net_value, h.day_growth, h.nav_date
+                FROM (SELECT DISTINCT fund_code FROM portfolio_funds) p
+                JOIN fund_nav_history h ON h.fund_code = p.fund_code
+                    AND h.nav_date = (SELECT MAX(nav_date) FROM fund_nav_history WHERE fund_code = p.fund_code)
+                LEFT JOIN fund_info_cache c ON c.fund_code = p.fund_code
+                LEFT JOIN fund_universe u ON u.fund_code = p.fund_code
+                WHERE h.day_growth IS NOT NULL
+                ORDER BY h.day_growth DESC
+                LIMIT ?
+            ''', (limit,))
+            return [{
+                'code': row[0],
+                'name': row[1],
+                'net_value': row[2],
+                'day_growth': row[3],
+                'date': row[4]
+            } for row in self.cursor.fetchall()]
+        except Exception as e:
+            print(f"获取持有榜失败: {e}")
+            return []
+    
+    def get_cache(self, cache_key):
+        """
+        获取键值缓存
+        :param cache_key: 缓存键
+        :return: (内容, 更新时间)，不存在返回(None, None)
+        """
+        try:
+            self.cursor.execute(
+                "SELECT payload, update_time FROM kv_cache WHERE cache_key = ?",
+                (cache_key,)
+            )
+            row = self.cursor.fetchone()
+            return (row[0], row[1]) if row else (None, None)
+        except Exception as e:
+            print(f"获取缓存失败: {e}")
+            return (None, None)
+    
+    def set_cache(self, cache_key, payload, update_time=None):
+        """
+        保存键值缓存
+        :param cache_key: 缓存键
+        :param payload: 缓存内容（字符串）
+        :param update_time: 更新时间，默认当前时间
+        :return: 是否保存成功
+        """
+        try:
+            with self.transaction():
+                self.cursor.execute(
+                    "INSERT OR REPLACE INTO kv_cache (cache_key, payload, update_time) VALUES (?, ?, ?)",
+                    (cache_key, payload, time.time() if update_time is None else update_time)
+                )
+            return True
+        except Exception as e:
+            print(f"保存缓存失败: {e}")
+            return False
+
 # 初始化数据库
 def init_db():
     """初始化数据库"""
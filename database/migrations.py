@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库结构版本迁移
+
+数据库版本记录在 PRAGMA user_version 中，每个迁移步骤在独立事务中执行，
+执行成功后更新版本号。新增表、索引或约束时在 MIGRATIONS 末尾追加步骤，
+不要修改已发布的步骤。
+"""
+
+def _create_base_tables(cursor):
+    """创建自选基金、组合及组合基金表"""
+    # 创建自选基金表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS favorite_funds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fund_code TEXT UNIQUE,
+            fund_name TEXT,
+            fund_type TEXT,
+            add_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 创建基金组合表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fund_portfolios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            portfolio_name TEXT,
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 创建组合基金关联表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio_funds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            portfolio_id INTEGER,
+            fund_code TEXT,
+            FOREIGN KEY (portfolio_id) REFERENCES fund_portfolios(id)
+        )
+    ''')
+
+def _create_fund_info_cache(cursor):
+    """创建基金基本信息缓存表"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fund_info_cache (
+            fund_code TEXT PRIMARY KEY,
+            fund_name TEXT,
+            fund_type TEXT,
+            update_time REAL
+        )
+    ''')
+
+def _create_fund_nav_history(cursor):
+    """创建基金历史净值表"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fund_nav_history (
+            fund_code TEXT,
+            nav_date TEXT,
+            net_value REAL,
+            acc_value REAL,
+            day_growth REAL,
+            PRIMARY KEY (fund_code, nav_date)
+        ) WITHOUT ROWID
+    ''')
+
+def _create_fund_universe_and_cache(cursor):
+    """创建全部基金列表表和通用键值缓存表"""
+    # 创建全部基金列表表（用于本地搜索）
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fund_universe (
+            fund_code TEXT PRIMARY KEY,
+            fund_name TEXT,
+            fund_type TEXT,
+            pinyin_abbr TEXT,
+            pinyin_full TEXT,
+            update_time REAL
+        )
+    ''')
+
+    # 创建通用键值缓存表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kv_cache (
+            cache_key TEXT PRIMARY KEY,
+            payload TEXT,
+            update_time REAL
+        )
+    ''')
+
+def _index_portfolio_funds(cursor):
+    """组合基金去重并建立索引"""
+    # 去除组合中的重复基金，之后由唯一索引保证不重复
+    cursor.execute('''
+        DELETE FROM portfolio_funds WHERE id NOT IN (
+            SELECT MIN(id) FROM portfolio_funds GROUP BY portfolio_id, fund_code
+        )
+    ''')
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_portfolio_funds_portfolio_fund ON portfolio_funds (portfolio_id, fund_code)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_portfolio_funds_fund_code ON portfolio_funds (fund_code)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_fund_portfolios_name ON fund_portfolios (portfolio_name)"
+    )
+
+# 迁移步骤：(版本号, 迁移函数)，版本号从1开始连续递增
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _create_fund_info_cache),
+    (3, _create_fund_nav_history),
+    (4, _create_fund_universe_and_cache),
+    (5, _index_portfolio_funds)
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(db):
+    """
+    获取数据库当前的结构版本
+    :param db: FundDB实例
+    :return: 版本号
+    """
+    db.cursor.execute("PRAGMA user_version")
+    return db.cursor.fetchone()[0]
+
+def migrate(db):
+    """
+    将数据库升级到最新结构版本，已是最新版本时不执行任何DDL
+    :param db: FundDB实例
+    :return: 升级后的版本号
+    """
+    version = get_schema_version(db)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    for target_version, migration in MIGRATIONS:
+        if target_version <= version:
+            continue
+        with db.transaction():
+            migration(db.cursor)
+            db.cursor.execute(f"PRAGMA user_version = {target_version}")
+        version = target_version
+    return version
@@ -6,17 +6,40 @@
 
 import sys
 import os
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QMessageBox, QToolBar, QAction
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon
+import time
+import importlib
+
+# 进程启动时间，用于统计首屏渲染耗时
+STARTUP_TIME = time.perf_counter()
 
 # 添加项目路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from ui.refresh_tab import RefreshTab
-from ui.favorite_tab import FavoriteTab
-from ui.market_tab import MarketTab
-from database.db_manager import init_db
+from utils.startup_profile import StartupProfiler
+
+# --profile-startup：统计启动各阶段、模块导入和函数调用耗时，首次绘制后输出报告并退出
+PROFILE_STARTUP = '--profile-startup' in sys.argv
+if PROFILE_STARTUP:
+    sys.argv.remove('--profile-startup')
+startup_profiler = StartupProfiler(STARTUP_TIME)
+if PROFILE_STARTUP:
+    startup_profiler.install_import_hook()
+
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QMessageBox, QToolBar, QAction
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QIcon
+
+from database.db_manager import init_db, get_connection_manager
+from utils.refresh_scheduler import RefreshScheduler
+
+startup_profiler.record('导入模块', STARTUP_TIME)
+
+# 标签页名称 -> (页面模块, 页面类)，页面模块在首次切换到该页时才导入
+TABS = {
+    '刷新': ('ui.refresh_tab', 'RefreshTab'),
+    '自选': ('ui.favorite_tab', 'FavoriteTab'),
+    '行情': ('ui.market_tab', 'MarketTab'),
+}
 
 class FundManagerApp(QMainWindow):
     """基金管理器主应用"""
@@ -26,7 +49,8 @@ class FundManagerApp(QMainWindow):
         self.setGeometry(100, 100, 1200, 800)
         
         # 初始化数据库
-        init_db()
+        with startup_profiler.phase('初始化数据库'):
+            init_db()
         
         # 创建菜单栏
         menubar = self.menuBar()
@@ -57,6 +81,11 @@ class FundManagerApp(QMainWindow):
         network_settings_action.triggered.connect(self.show_network_settings)
         settings_menu.addAction(network_settings_action)
         
+        # 添加清除基金信息缓存选项
+        clear_cache_action = QAction('清除基金信息缓存', self)
+        clear_cache_action.triggered.connect(self.clear_fund_info_cache)
+        settings_menu.addAction(clear_cache_action)
+        
         # 添加界面设置选项
         interface_settings_action = QAction('界面设置', self)
         interface_settings_action.triggered.connect(self.show_interface_settings)
@@ -91,14 +120,97 @@ class FundManagerApp(QMainWindow):
         self.tab_widget = QTabWidget()
         self.layout.addWidget(self.tab_widget)
         
-        # 添加三个标签页
-        self.refresh_tab = RefreshTab()
-        self.favorite_tab = FavoriteTab()
-        self.market_tab = MarketTab()
-        
-        self.tab_widget.addTab(self.refresh_tab, '刷新')
-        self.tab_widget.addTab(self.favorite_tab, '自选')
-        self.tab_widget.addTab(self.market_tab, '行情')
+        # 添加三个标签页，先放入空的容器，页面在首次显示时才创建，构造时只读取本地数据
+        self.tabs = {}  # 标签名称 -> 已创建的页面
+        for name in TABS:
+            container = QWidget()
+            QVBoxLayout(container).setContentsMargins(0, 0, 0, 0)
+            self.tab_widget.addTab(container, name)
+        
+        # 自动刷新：基金净值跟随A股交易时段，行情页跟随A股、港股、美股交易时段
+        # 只有当前显示的页面会刷新，而当前页面一定已经创建
+        self.refresh_scheduler = RefreshScheduler(self)
+        self.refresh_scheduler.add_job('刷新', lambda: self.tabs['刷新'].auto_refresh(), ['A股'],
+                                       lambda: self.is_tab_visible('刷新'))
+        self.refresh_scheduler.add_job('自选', lambda: self.tabs['自选'].auto_refresh(), ['A股'],
+                                       lambda: self.is_tab_visible('自选'))
+        self.refresh_scheduler.add_job('行情', lambda: self.tabs['行情'].auto_refresh(), ['A股', '港股', '美股'],
+                                       lambda: self.is_tab_visible('行情'))
+        
+        # 网络刷新推迟到首次绘制之后
+        self.first_paint_time = None
+        self._first_paint_done = False
+        self._background_started = False
+        
+        # 启动时只创建当前页，切换页面时创建其余页面并刷新已过期的数据
+        self.get_tab(self.tab_widget.tabText(self.tab_widget.currentIndex()))
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+    
+    def get_tab(self, name):
+        """
+        获取标签页，首次获取时导入页面模块并创建页面
+        :param name: 标签名称
+        :return: 页面控件
+        """
+        tab = self.tabs.get(name)
+        if tab is not None:
+            return tab
+        
+        module_name, class_name = TABS[name]
+        with startup_profiler.phase(f'创建{name}页'):
+            tab = getattr(importlib.import_module(module_name), class_name)()
+        self.tab_widget.widget(list(TABS).index(name)).layout().addWidget(tab)
+        self.tabs[name] = tab
+        
+        # 首次绘制之后才创建的页面立即启动后台任务
+        start_background_tasks = getattr(tab, 'start_background_tasks', None)
+        if self._background_started and start_background_tasks:
+            start_background_tasks()
+        return tab
+    
+    def is_tab_visible(self, name):
+        """
+        判断标签页是否已创建且正在显示
+        :param name: 标签名称
+        :return: 是否可见
+        """
+        return name in self.tabs and self.tab_widget.tabText(self.tab_widget.currentIndex()) == name
+    
+    def on_tab_changed(self, index):
+        """切换页面：首次显示时创建页面，然后刷新已过期的数据"""
+        if index < 0:
+            return
+        self.get_tab(self.tab_widget.tabText(index))
+        self.refresh_scheduler.run_stale_jobs()
+    
+    def paintEvent(self, event):
+        """首次绘制完成后启动后台任务"""
+        super().paintEvent(event)
+        if not self._first_paint_done:
+            self._first_paint_done = True
+            # 等本次绘制结束后再启动
+            QTimer.singleShot(0, self.on_first_paint)
+    
+    def on_first_paint(self):
+        """记录首屏渲染耗时，启动已创建页面的后台任务和自动刷新调度"""
+        self.first_paint_time = time.perf_counter() - STARTUP_TIME
+        print(f"首屏渲染耗时: {self.first_paint_time * 1000:.0f} ms")
+        self.statusBar().showMessage(f"启动耗时 {self.first_paint_time * 1000:.0f} ms", 5000)
+        
+        if PROFILE_STARTUP:
+            # 只统计到首次绘制，不发起网络请求
+            startup_profiler.record('启动到首次绘制', STARTUP_TIME)
+            startup_profiler.stop()
+            print(startup_profiler.report())
+            QApplication.quit()
+            return
+        
+        self._background_started = True
+        for tab in list(self.tabs.values()):
+            start_background_tasks = getattr(tab, 'start_background_tasks', None)
+            if start_background_tasks:
+                start_background_tasks()
+        self.refresh_scheduler.start()
     
     def toggle_fullscreen(self):
         """切换全屏状态"""
@@ -109,21 +221,111 @@ class FundManagerApp(QMainWindow):
     
     def show_refresh_settings(self):
         """显示刷新设置"""
-        refresh_settings_text = "刷新设置：\n\n"
-        refresh_settings_text += "1. 自动刷新频率\n"
-        refresh_settings_text += "2. 手动刷新选项\n"
-        refresh_settings_text += "3. 组合刷新设置\n"
-        
-        QMessageBox.information(self, '刷新设置', refresh_settings_text)
+        from PyQt5.QtWidgets import QDialog, QFormLayout, QSpinBox, QCheckBox, QDialogButtonBox, QLabel, QLineEdit
+        from utils.refresh_scheduler import (
+            MARKET_SESSIONS, CUSTOM_HOLIDAYS, is_market_open, missing_holiday_calendar, parse_holiday_dates
+        )
+        
+        scheduler = self.refresh_scheduler
+        
+        # 创建刷新设置对话框
+        settings_dialog = QDialog(self)
+        settings_dialog.setWindowTitle('刷新设置')
+        
+        layout = QFormLayout(settings_dialog)
+        
+        # 是否启用自动刷新
+        enabled_check = QCheckBox('交易时段内自动刷新')
+        enabled_check.setChecked(scheduler.enabled)
+        layout.addRow('自动刷新:', enabled_check)
+        
+        # 自动刷新频率
+        interval_spin = QSpinBox()
+        interval_spin.setRange(10, 3600)
+        interval_spin.setSuffix(' 秒')
+        interval_spin.setValue(scheduler.interval)
+        layout.addRow('自动刷新频率:', interval_spin)
+        
+        # 各市场交易状态
+        for market in MARKET_SESSIONS:
+            status = '交易中' if is_market_open(market) else '休市'
+            missing_year = missing_holiday_calendar(market)
+            if missing_year:
+                status += f'（缺少{missing_year}年休市日历，节假日会照常刷新，请在下方补充）'
+            layout.addRow(f'{market}:', QLabel(status))
+        
+        # 内置日历之外的休市日
+        holiday_edits = {}
+        for market in MARKET_SESSIONS:
+            holiday_edit = QLineEdit(', '.join(sorted(CUSTOM_HOLIDAYS.get(market, ()))))
+            holiday_edit.setPlaceholderText('YYYY-MM-DD，多个日期用逗号分隔')
+            holiday_edits[market] = holiday_edit
+            layout.addRow(f'{market}额外休市日:', holiday_edit)
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(settings_dialog.accept)
+        buttons.rejected.connect(settings_dialog.reject)
+        layout.addRow(buttons)
+        
+        if settings_dialog.exec_() == QDialog.Accepted:
+            holidays = {market: parse_holiday_dates(edit.text()) for market, edit in holiday_edits.items()}
+            scheduler.configure(enabled_check.isChecked(), interval_spin.value(), holidays)
     
     def show_network_settings(self):
         """显示网络设置"""
-        network_settings_text = "网络设置：\n\n"
-        network_settings_text += "1. 网络连接测试\n"
-        network_settings_text += "2. API超时设置\n"
-        network_settings_text += "3. 代理设置\n"
+        from PyQt5.QtWidgets import QDialog, QFormLayout, QSpinBox, QDialogButtonBox, QLabel
+        from utils.refresh_engine import get_refresh_config, set_refresh_config
+        from api.fund_api import get_session_pool, get_request_coalescer
+        
+        config = get_refresh_config()
+        session_pool = get_session_pool()
+        
+        # 创建网络设置对话框
+        settings_dialog = QDialog(self)
+        settings_dialog.setWindowTitle('网络设置')
+        
+        layout = QFormLayout(settings_dialog)
+        
+        # 最大并发数
+        max_workers_spin = QSpinBox()
+        max_workers_spin.setRange(1, 64)
+        max_workers_spin.setValue(config['max_workers'])
+        layout.addRow('最大并发请求数:', max_workers_spin)
+        
+        # 单主机并发数
+        per_host_spin = QSpinBox()
+        per_host_spin.setRange(1, 32)
+        per_host_spin.setValue(config['per_host_limit'])
+        layout.addRow('单主机并发请求数:', per_host_spin)
+        
+        # 连接池大小
+        pool_size_spin = QSpinBox()
+        pool_size_spin.setRange(1, 64)
+        pool_size_spin.setValue(session_pool.pool_maxsize)
+        layout.addRow('单主机连接池大小:', pool_size_spin)
+        
+        # 请求合并统计
+        stats = get_request_coalescer().get_stats()
+        layout.addRow('请求合并:', QLabel(f"复用 {stats['hits']} 次 / 实际请求 {stats['misses']} 次"))
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(settings_dialog.accept)
+        buttons.rejected.connect(settings_dialog.reject)
+        layout.addRow(buttons)
+        
+        if settings_dialog.exec_() == QDialog.Accepted:
+            set_refresh_config(max_workers_spin.value(), per_host_spin.value())
+            if pool_size_spin.value() != session_pool.pool_maxsize:
+                session_pool.configure(pool_size_spin.value())
+    
+    def clear_fund_info_cache(self):
+        """清除基金信息缓存"""
+        from api.fund_api import FundAPI
         
-        QMessageBox.information(self, '网络设置', network_settings_text)
+        if FundAPI().invalidate_fund_info_cache():
+            QMessageBox.information(self, '成功', '基金信息缓存已清除')
+        else:
+            QMessageBox.warning(self, '提示', '清除基金信息缓存失败')
     
     def show_interface_settings(self):
         """显示界面设置"""
@@ -214,7 +416,13 @@ class FundManagerApp(QMainWindow):
         webbrowser.open('https://github.com/tinygeeker')
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    window = FundManagerApp()
-    window.show()
+    if PROFILE_STARTUP:
+        startup_profiler.start_profile()
+    with startup_profiler.phase('创建QApplication'):
+        app = QApplication(sys.argv)
+    # 退出时关闭主线程的数据库连接，完成WAL检查点
+    app.aboutToQuit.connect(get_connection_manager().close_connection)
+    with startup_profiler.phase('创建主窗口'):
+        window = FundManagerApp()
+        window.show()
     sys.exit(app.exec_())
@@ -7,17 +7,41 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, 
     QListWidget, QListWidgetItem, QMessageBox, QTableWidget, 
-    QTableWidgetItem, QHeaderView, QSplitter
+    QTableWidgetItem, QHeaderView, QSplitter, QTableView, QProgressBar
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 
 from api.fund_api import FundAPI
 from database.db_manager import FundDB
+from ui.refresh_tab import FundUpdateThread
+from ui.refresh_jobs import RefreshJobRunner
+from ui.fund_table_model import (
+    FundTableModel, FundTableUpdater, quote_row_key, FUND_NAME_COLUMN, FUND_CODE_COLUMN, FUND_TYPE_COLUMN,
+    NET_VALUE_COLUMN, DAY_GROWTH_COLUMN, PREDICTED_COLUMN, DATE_COLUMN, STATUS_COLUMN
+)
+from utils.fund_index import get_fund_index
+from utils.refresh_engine import get_refresh_config, host_slot, FundRefreshEngine, FUND_INFO_HOST
 
-class FavoriteFundUpdateThread(QThread):
+class FavoriteFundUpdateThread(FundUpdateThread):
     """自选基金数据更新线程"""
-    update_signal = pyqtSignal(list)
+
+class FundIndexThread(QThread):
+    """基金搜索索引加载与同步线程"""
+    ready_signal = pyqtSignal(int)
+    
+    def run(self):
+        fund_index = get_fund_index()
+        # 先用本地数据建立索引，再按需从网络增量同步
+        if not len(fund_index):
+            fund_index.load()
+            self.ready_signal.emit(len(fund_index))
+        if fund_index.needs_sync():
+            fund_index.sync()
+            self.ready_signal.emit(len(fund_index))
+
+class FavoriteAddThread(QThread):
+    """批量添加自选基金线程：本地已知的基金直接添加，其余并发验证"""
+    finished_signal = pyqtSignal(int, list)
     
     def __init__(self, fund_codes):
         super().__init__()
@@ -25,27 +49,48 @@ class FavoriteFundUpdateThread(QThread):
         self.api = FundAPI()
     
     def run(self):
-        fund_data_list = []
-        for code in self.fund_codes:
-            fund_info = self.api.get_fund_info(code)
-            fund_net_value = self.api.get_fund_net_value(code)
-            if fund_info and fund_net_value:
-                fund_data = {
-                    'code': code,
-                    'name': fund_info['name'],
-                    'type': fund_info['type'],
-                    'net_value': fund_net_value['net_value'],
-                    'day_growth': fund_net_value['day_growth'],
-                    'date': fund_net_value['date']
-                }
-                fund_data_list.append(fund_data)
-        self.update_signal.emit(fund_data_list)
+        from concurrent.futures import ThreadPoolExecutor
+        
+        db = FundDB()
+        known_funds = db.get_known_funds(self.fund_codes)
+        db.close()
+        
+        # 本地未知的基金并发验证，与刷新任务共享单主机并发限制
+        unknown_codes = [code for code in self.fund_codes if code not in known_funds]
+        invalid_codes = []
+        if unknown_codes:
+            workers = min(get_refresh_config()['max_workers'], len(unknown_codes))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for code, fund_info in zip(unknown_codes, executor.map(self._fetch_fund_info, unknown_codes)):
+                    if fund_info:
+                        known_funds[code] = fund_info
+                    else:
+                        invalid_codes.append(code)
+        
+        funds = [known_funds[code] for code in self.fund_codes if code in known_funds]
+        added = 0
+        if funds:
+            db = FundDB()
+            added = db.add_favorite_funds(funds) or 0
+            db.close()
+        self.finished_signal.emit(added, invalid_codes)
+    
+    def _fetch_fund_info(self, code):
+        """获取基金信息（受单主机并发限制）"""
+        with host_slot(FUND_INFO_HOST):
+            return self.api.get_fund_info(code)
 
 class FavoriteTab(QWidget):
     """自选模块界面"""
     def __init__(self):
         super().__init__()
         self.init_ui()
+        # 先显示本地保存的数据，网络刷新在窗口显示后由 start_background_tasks 启动
+        self.show_local_favorites()
+    
+    def start_background_tasks(self):
+        """启动后台任务：加载并同步搜索索引、刷新自选基金"""
+        self.load_fund_index()
         self.load_favorite_funds()
     
     def init_ui(self):
@@ -56,11 +101,18 @@ class FavoriteTab(QWidget):
         top_layout = QHBoxLayout()
         
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText('输入基金代码或名称')
+        self.search_input.setPlaceholderText('输入基金代码、名称或拼音首字母')
         top_layout.addWidget(self.search_input)
         
+        # 输入时延迟搜索，避免每个按键都刷新结果
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.search_funds_as_you_type)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        
         self.search_btn = QPushButton('搜索')
-        self.search_btn.clicked.connect(self.search_funds)
+        self.search_btn.clicked.connect(lambda: self.search_funds())
         top_layout.addWidget(self.search_btn)
         
         self.add_favorite_btn = QPushButton('添加到自选')
@@ -71,6 +123,12 @@ class FavoriteTab(QWidget):
         self.refresh_btn.clicked.connect(self.refresh_data)
         top_layout.addWidget(self.refresh_btn)
         
+        # 刷新进度
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat('%v/%m')
+        self.progress_bar.setMaximumWidth(160)
+        top_layout.addWidget(self.progress_bar)
+        
         self.layout.addLayout(top_layout)
         
         # 中间分割器
@@ -88,12 +146,21 @@ class FavoriteTab(QWidget):
         self.search_result_table.setSelectionBehavior(QTableWidget.SelectRows)
         splitter.addWidget(self.search_result_table)
         
-        # 右侧自选基金区域
-        self.fund_table = QTableWidget()
-        self.fund_table.setColumnCount(6)
-        self.fund_table.setHorizontalHeaderLabels(['基金名称', '基金代码', '基金类型', '单位净值', '日涨跌幅', '更新日期'])
+        # 右侧自选基金区域，刷新时按基金代码增量更新
+        self.fund_model = FundTableModel([
+            FUND_NAME_COLUMN, FUND_CODE_COLUMN, FUND_TYPE_COLUMN, NET_VALUE_COLUMN,
+            DAY_GROWTH_COLUMN, PREDICTED_COLUMN, DATE_COLUMN, STATUS_COLUMN
+        ], key=quote_row_key, parent=self)
+        self.fund_updater = FundTableUpdater(self.fund_model, self.progress_bar, self)
+        # 刷新任务：再次刷新时取消旧任务
+        self.refresh_jobs = RefreshJobRunner(self)
+        self.fund_table = QTableView()
+        self.fund_table.setModel(self.fund_model)
         self.fund_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.fund_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.fund_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.fund_table.setSortingEnabled(True)
+        self.fund_table.setSelectionBehavior(QTableView.SelectRows)
+        self.fund_table.setEditTriggers(QTableView.NoEditTriggers)
         splitter.addWidget(self.fund_table)
         
         # 设置分割器比例，左右高度对齐
@@ -101,6 +168,15 @@ class FavoriteTab(QWidget):
         
         self.layout.addWidget(splitter)
     
+    def show_local_favorites(self):
+        """用本地保存的数据显示自选基金（不发起网络请求）"""
+        db = FundDB()
+        favorite_funds = db.get_favorite_funds()
+        db.close()
+        
+        fund_infos = {fund['code']: fund for fund in favorite_funds}
+        self.fund_updater.show_cached(FundRefreshEngine().load_local(list(fund_infos), fund_infos))
+    
     def load_favorite_funds(self):
         """加载自选基金"""
         db = FundDB()
@@ -109,163 +185,75 @@ class FavoriteTab(QWidget):
         
         fund_codes = [fund['code'] for fund in favorite_funds]
         if fund_codes:
-            # 启动线程更新基金数据
-            self.update_thread = FavoriteFundUpdateThread(fund_codes)
-            self.update_thread.update_signal.connect(self.update_fund_table)
-            self.update_thread.start()
+            # 启动线程更新基金数据，取代仍在运行的旧任务
+            update_thread = FavoriteFundUpdateThread(fund_codes)
+            self.refresh_jobs.supersede(update_thread)
+            self.fund_updater.attach(update_thread, self.refresh_jobs)
+            update_thread.start()
         else:
-            self.fund_table.setRowCount(0)
-    
-    def update_fund_table(self, fund_data_list):
-        """更新基金表格"""
-        from utils.profit_prediction import ProfitPrediction
-        from api.fund_api import FundAPI
-        
-        predictor = ProfitPrediction()
-        api = FundAPI()
-        market_data = api.get_market_index()
-        
-        # 添加预测收益列
-        if self.fund_table.columnCount() == 6:
-            self.fund_table.setColumnCount(7)
-            headers = ['基金名称', '基金代码', '基金类型', '单位净值', '日涨跌幅', '预测收益', '更新日期']
-            self.fund_table.setHorizontalHeaderLabels(headers)
-        
-        self.fund_table.setRowCount(len(fund_data_list))
-        
-        for row, fund_data in enumerate(fund_data_list):
-            # 基金名称
-            name_item = QTableWidgetItem(fund_data['name'])
-            self.fund_table.setItem(row, 0, name_item)
-            
-            # 基金代码
-            code_item = QTableWidgetItem(fund_data['code'])
-            self.fund_table.setItem(row, 1, code_item)
-            
-            # 基金类型
-            type_item = QTableWidgetItem(fund_data['type'])
-            self.fund_table.setItem(row, 2, type_item)
-            
-            # 单位净值
-            net_value_item = QTableWidgetItem(fund_data['net_value'])
-            self.fund_table.setItem(row, 3, net_value_item)
-            
-            # 日涨跌幅
-            day_growth_item = QTableWidgetItem(fund_data['day_growth'])
-            if fund_data['day_growth'].startswith('+'):
-                day_growth_item.setForeground(QColor('red'))
-            elif fund_data['day_growth'].startswith('-'):
-                day_growth_item.setForeground(QColor('green'))
-            self.fund_table.setItem(row, 4, day_growth_item)
-            
-            # 预测收益
-            predicted_profit = predictor.predict_daily_profit([fund_data], market_data)
-            predicted_item = QTableWidgetItem(f"{predicted_profit:+.2f}%")
-            if predicted_profit > 0:
-                predicted_item.setForeground(QColor('red'))
-            elif predicted_profit < 0:
-                predicted_item.setForeground(QColor('green'))
-            self.fund_table.setItem(row, 5, predicted_item)
-            
-            # 更新日期
-            date_item = QTableWidgetItem(fund_data['date'])
-            self.fund_table.setItem(row, 6, date_item)
+            self.refresh_jobs.cancel()
+            self.fund_updater.reset()
+            self.fund_model.clear()
     
     def add_favorite_fund(self):
         """添加自选基金"""
         # 检查是否有勾选的基金
-        checked_rows = []
+        fund_codes = []
         for row in range(self.search_result_table.rowCount()):
             item = self.search_result_table.item(row, 0)
             if item and item.checkState() == Qt.Checked:
-                checked_rows.append(row)
+                fund_codes.append(self.search_result_table.item(row, 2).text())
         
-        if not checked_rows:
+        if not fund_codes:
             QMessageBox.warning(self, '提示', '请选择要添加的基金')
             return
         
-        # 验证并添加勾选的基金
-        api = FundAPI()
-        db = FundDB()
-        success_count = 0
+        # 后台验证并批量添加勾选的基金
+        self.add_favorite_btn.setEnabled(False)
+        self.add_thread = FavoriteAddThread(fund_codes)
+        self.add_thread.finished_signal.connect(self.on_favorite_funds_added)
+        self.add_thread.start()
+    
+    def on_favorite_funds_added(self, added, invalid_codes):
+        """批量添加自选基金完成"""
+        self.add_favorite_btn.setEnabled(True)
         
-        for row in checked_rows:
-            fund_code = self.search_result_table.item(row, 2).text()
-            fund_name = self.search_result_table.item(row, 1).text()
-            fund_type = self.search_result_table.item(row, 3).text()
-            
-            # 验证基金代码是否有效
-            fund_info = api.get_fund_info(fund_code)
-            if not fund_info:
-                QMessageBox.error(self, '错误', f'基金 {fund_name} 不存在')
-                continue
-            
-            # 添加到数据库
-            success = db.add_favorite_fund(fund_code, fund_info['name'], fund_info['type'])
-            if success:
-                success_count += 1
+        if invalid_codes:
+            QMessageBox.warning(self, '提示', f'以下基金不存在：{", ".join(invalid_codes)}')
         
-        db.close()
-        
-        if success_count > 0:
-            QMessageBox.information(self, '成功', f'成功添加 {success_count} 只基金到自选')
+        if added > 0:
+            QMessageBox.information(self, '成功', f'成功添加 {added} 只基金到自选')
             self.load_favorite_funds()
-        else:
-            QMessageBox.error(self, '错误', '添加自选失败，基金可能已在自选列表中')
+        elif not invalid_codes:
+            QMessageBox.critical(self, '错误', '添加自选失败，基金可能已在自选列表中')
+    
+    def load_fund_index(self):
+        """后台加载并同步基金搜索索引"""
+        self.index_thread = FundIndexThread()
+        self.index_thread.ready_signal.connect(self.search_funds_as_you_type)
+        self.index_thread.start()
     
-    def search_funds(self):
+    def search_funds_as_you_type(self):
+        """输入过程中搜索基金"""
+        if self.search_input.text().strip():
+            self.search_funds(show_warning=False)
+    
+    def search_funds(self, show_warning=True):
         """搜索基金"""
         search_text = self.search_input.text().strip()
         if not search_text:
-            QMessageBox.warning(self, '提示', '请输入搜索内容')
+            if show_warning:
+                QMessageBox.warning(self, '提示', '请输入搜索内容')
             return
         
-        # 使用真实API数据进行搜索
-        from api.fund_api import FundAPI
-        api = FundAPI()
-        
-        # 获取基金排行榜数据作为搜索结果
-        fund_rank = api.get_fund_rank()
-        
-        # 如果API返回空数据，使用默认数据
-        if not fund_rank:
-            fund_rank = [
-                {'code': '000001', 'name': '华夏成长混合', 'net_value': '1.5678', 'day_growth': '+0.87%'},
-                {'code': '110022', 'name': '易方达消费行业股票', 'net_value': '1.0234', 'day_growth': '+0.12%'},
-                {'code': '001475', 'name': '易方达国防军工混合', 'net_value': '3.2456', 'day_growth': '+1.23%'},
-                {'code': '000689', 'name': '前海开源新经济混合', 'net_value': '2.8765', 'day_growth': '+0.98%'},
-                {'code': '001593', 'name': '天弘中证计算机ETF联接', 'net_value': '1.6789', 'day_growth': '+0.21%'},
-                {'code': '000008', 'name': '华夏全球精选', 'net_value': '2.3456', 'day_growth': '+0.43%'},
-                {'code': '000006', 'name': '华夏优势增长', 'net_value': '1.9876', 'day_growth': '+0.65%'}
-            ]
-        
-        # 过滤搜索结果
-        search_results = []
-        for fund in fund_rank:
-            if search_text in fund['code'] or search_text in fund['name']:
-                # 获取真实的基金类型
-                fund_info = api.get_fund_info(fund['code'])
-                if fund_info:
-                    fund['type'] = fund_info['type']
-                else:
-                    fund['type'] = '未知类型'
-                search_results.append(fund)
+        fund_index = get_fund_index()
+        if not len(fund_index):
+            if show_warning:
+                QMessageBox.warning(self, '提示', '基金列表正在同步，请稍后再试')
+            return
         
-        # 如果没有匹配结果，尝试直接通过基金代码获取
-        if not search_results:
-            # 尝试直接获取基金信息
-            fund_info = api.get_fund_info(search_text)
-            if fund_info:
-                # 获取基金净值
-                fund_net_value = api.get_fund_net_value(search_text)
-                if fund_net_value:
-                    search_results.append({
-                        'code': search_text,
-                        'name': fund_info['name'],
-                        'type': fund_info['type'],
-                        'net_value': fund_net_value['net_value'],
-                        'day_growth': fund_net_value['day_growth']
-                    })
+        # 使用本地索引搜索
+        search_results = fund_index.search(search_text)
         
         # 显示搜索结果
         self.search_result_table.setRowCount(len(search_results))
@@ -283,11 +271,17 @@ class FavoriteTab(QWidget):
             code_item = QTableWidgetItem(fund.get('code', ''))
             self.search_result_table.setItem(row, 2, code_item)
             
-            # 基金类型（真实数据）
-            type_item = QTableWidgetItem(fund.get('type', '未知类型'))
+            # 基金类型
+            type_item = QTableWidgetItem(fund.get('type') or '未知类型')
             self.search_result_table.setItem(row, 3, type_item)
     
     def refresh_data(self):
         """刷新数据"""
         self.load_favorite_funds()
         QMessageBox.information(self, '成功', '数据刷新完成')
+    
+    def auto_refresh(self):
+        """自动刷新（由刷新调度器调用，不弹出提示，上次刷新未完成时跳过）"""
+        if self.refresh_jobs.is_running():
+            return
+        self.load_favorite_funds()
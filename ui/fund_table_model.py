@@ -0,0 +1,623 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基金表格数据模型：按键增量更新，只通知发生变化的单元格
+
+数据按列存储（数值列使用 array('d')，缺失值为NaN），不保留行记录对象，
+显示文本只在视图请求可见行时格式化；行数较多时通过 fetchMore 分批向视图暴露，
+排序使用按列缓存的预计算索引。
+"""
+
+import math
+from array import array
+from typing import Any, Callable, NamedTuple, Optional
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QTimer
+from PyQt5.QtGui import QColor
+
+class Column(NamedTuple):
+    """表格列定义"""
+    header: str
+    value: Callable[[Any], Any]  # 从行记录取出单元格原始值（用于比较和排序）
+    text: Optional[Callable[[Any], str]] = None  # 原始值转显示文本，默认str
+    color: Optional[Callable[[Any], Optional[QColor]]] = None  # 原始值转文字颜色
+    numeric: bool = False  # 数值列，按浮点数紧凑存储
+
+def format_net_value(value):
+    """净值显示文本"""
+    return '--' if value is None else f"{value:.4f}"
+
+def format_percent(value):
+    """涨跌幅显示文本"""
+    return '--' if value is None else f"{value:+.2f}%"
+
+def format_rank(value):
+    """序号显示文本"""
+    return '' if value is None else f"{value:.0f}"
+
+def growth_color(value):
+    """涨红跌绿"""
+    if value is None or value == 0:
+        return None
+    return QColor('red') if value > 0 else QColor('green')
+
+def format_status(value):
+    """刷新状态显示文本"""
+    return value or '已更新'
+
+def status_color(value):
+    """获取失败的状态显示为灰色"""
+    return QColor('gray') if value else None
+
+def _changed_slots(old, new, numeric):
+    """
+    比较一列新旧数据
+    :return: 值发生变化的存储位置列表
+    """
+    if numeric:
+        return [slot for slot, (a, b) in enumerate(zip(old, new)) if a != b and not (a != a and b != b)]
+    return [slot for slot, (a, b) in enumerate(zip(old, new)) if a != b]
+
+def _diff_column(old, new, numeric, block=256):
+    """
+    比较一整列新旧数据（长度相同），先按块整体比较，只逐个检查有差异的块
+    :param old: 旧数据，数值列为 array('d')，其余为列表
+    :param new: 新数据，类型与旧数据相同
+    :param numeric: 是否为数值列
+    :param block: 每块的行数
+    :return: 值发生变化的存储位置列表
+    """
+    if numeric:
+        # 按字节比较，NaN与NaN视为相同
+        old, new, size = old.tobytes(), new.tobytes(), old.itemsize
+        if old == new:
+            return []
+        changed = []
+        for start in range(0, len(old) // size, block):
+            old_block = old[start * size:(start + block) * size]
+            new_block = new[start * size:(start + block) * size]
+            if old_block != new_block:
+                changed.extend(start + slot for slot in _changed_slots(
+                    array('d', old_block), array('d', new_block), True))
+        return changed
+    if old == new:
+        return []
+    changed = []
+    for start in range(0, len(old), block):
+        if old[start:start + block] != new[start:start + block]:
+            changed.extend(start + slot for slot in _changed_slots(
+                old[start:start + block], new[start:start + block], False))
+    return changed
+
+class FundTableModel(QAbstractTableModel):
+    """
+    以键（默认基金代码）标识行的表格模型。
+    update_rows 按键与现有数据比较：删除消失的行、追加新行、只对值变化的单元格发出 dataChanged，
+    行顺序变化通过 layoutChanged 调整并保留选中状态。
+    """
+
+    FETCH_BATCH = 200  # 每次向视图暴露的行数
+
+    def __init__(self, columns, key=None, parent=None):
+        super().__init__(parent)
+        self._columns = list(columns)
+        self._key = key or (lambda record: record['code'])
+        self._keys = []  # 存储顺序（即最近一次更新的输入顺序）的键
+        self._slots = {}  # 键 -> 存储位置
+        self._data = self._empty_data()  # 按列存储的单元格原始值
+        self._view = []  # 显示顺序：行号 -> 存储位置
+        self._loaded = 0  # 已向视图暴露的行数
+        self._sort_column = None
+        self._sort_order = Qt.AscendingOrder
+        self._sort_index = {}  # 列号 -> 按该列升序的存储位置（缓存）
+
+    def _empty_data(self):
+        """创建空的列存储"""
+        return [array('d') if column.numeric else [] for column in self._columns]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._view)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, len(self._view) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        slot = self._view[index.row()]
+        if role == Qt.UserRole:
+            return self._keys[slot]
+        column = self._columns[index.column()]
+        if role == Qt.DisplayRole:
+            value = self._cell(slot, index.column())
+            if column.text:
+                return column.text(value)
+            return '' if value is None else str(value)
+        if role == Qt.ForegroundRole and column.color:
+            return column.color(self._cell(slot, index.column()))
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._columns[section].header
+        return super().headerData(section, orientation, role)
+
+    def _cell(self, slot, column):
+        """
+        读取单元格原始值
+        :return: 数值列的NaN转为None
+        """
+        value = self._data[column][slot]
+        if self._columns[column].numeric and math.isnan(value):
+            return None
+        return value
+
+    def value(self, row, column):
+        """
+        获取单元格原始值
+        :param row: 行号
+        :param column: 列号
+        :return: 原始值，行号无效返回None
+        """
+        if 0 <= row < self._loaded:
+            return self._cell(self._view[row], column)
+        return None
+
+    def key(self, row):
+        """
+        获取行的键
+        :param row: 行号
+        :return: 键，行号无效返回None
+        """
+        if 0 <= row < self._loaded:
+            return self._keys[self._view[row]]
+        return None
+
+    def total_count(self):
+        """全部行数（含尚未向视图暴露的行）"""
+        return len(self._view)
+
+    def clear(self):
+        """清空所有行"""
+        if not self._keys:
+            return
+        self.beginResetModel()
+        self._keys = []
+        self._slots = {}
+        self._data = self._empty_data()
+        self._view = []
+        self._loaded = 0
+        self._sort_index = {}
+        self.endResetModel()
+
+    def _cell_values(self, record):
+        """
+        取出一行的单元格原始值（按存储格式转换）
+        :param record: 行记录
+        :return: 各列值列表
+        """
+        cells = []
+        for column in self._columns:
+            value = column.value(record)
+            if column.numeric:
+                cells.append(math.nan if value is None else float(value))
+            else:
+                cells.append('' if value is None else value)
+        return cells
+
+    @staticmethod
+    def _column_values(column, records):
+        """
+        取出一列的单元格原始值（按存储格式转换）
+        :param column: 列定义
+        :param records: 行记录列表
+        :return: 数值列为 array('d')，其余为列表
+        """
+        values = list(map(column.value, records))
+        if column.numeric:
+            try:
+                return array('d', values)
+            except TypeError:
+                return array('d', [math.nan if value is None else value for value in values])
+        if None in values:
+            return ['' if value is None else value for value in values]
+        return values
+
+    def update_rows(self, records):
+        """
+        按键增量更新表格，records 为全部行，不在其中的行被删除
+        :param records: 行记录列表（未排序时按此顺序显示）
+        """
+        keys = list(map(self._key, records))
+        if len(set(keys)) != len(keys):
+            # 重复的键只保留第一条
+            seen = set()
+            unique = [(key, record) for key, record in zip(keys, records) if not (key in seen or seen.add(key))]
+            keys = [key for key, _ in unique]
+            records = [record for _, record in unique]
+
+        if keys == self._keys:
+            self._update_values(records)
+        else:
+            data = [self._column_values(column, records) for column in self._columns]
+            self._update_structure(keys, data)
+
+    def _update_values(self, records):
+        """
+        行集合与顺序不变时的更新：逐列比较，只原地改写并通知变化的单元格
+        :param records: 行记录列表，与现有存储顺序一致
+        """
+        changed_columns = {}
+        for column, spec in enumerate(self._columns):
+            values = self._data[column]
+            new = self._column_values(spec, records)
+            for slot in _diff_column(values, new, spec.numeric):
+                values[slot] = new[slot]
+                changed_columns.setdefault(slot, []).append(column)
+        if not changed_columns:
+            return
+
+        resort = False
+        for column in {column for columns in changed_columns.values() for column in columns}:
+            self._sort_index.pop(column, None)
+            resort = resort or column == self._sort_column
+
+        rows = self._rows_of()
+        for slot, columns in changed_columns.items():
+            row = rows[slot]
+            if row < self._loaded:
+                self.dataChanged.emit(self.index(row, columns[0]), self.index(row, columns[-1]))
+
+        if resort:
+            self._apply_view(self._sorted_view())
+
+    def _update_structure(self, keys, data):
+        """
+        行集合或顺序变化时的更新：删除消失的行、更新已有行、追加新行并调整顺序
+        :param keys: 新的键列表
+        :param data: 新的列存储
+        """
+        new_slots = {key: slot for slot, key in enumerate(keys)}
+
+        # 删除不再存在的行，已暴露的连续行一次删除
+        loaded_before = self._loaded
+        row = self._loaded - 1
+        while row >= 0:
+            if self._keys[self._view[row]] in new_slots:
+                row -= 1
+                continue
+            last = row
+            while row > 0 and self._keys[self._view[row - 1]] not in new_slots:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row, last)
+            del self._view[row:last + 1]
+            self._loaded -= last - row + 1
+            self.endRemoveRows()
+            row -= 1
+        view_keys = [self._keys[slot] for slot in self._view if self._keys[slot] in new_slots]
+
+        # 切换到新的存储，通知已暴露行中变化的单元格
+        old_keys, old_data = self._keys, self._data
+        old_slots = {key: slot for slot, key in enumerate(old_keys)}
+        self._keys, self._slots, self._data = keys, new_slots, data
+        self._view = [new_slots[key] for key in view_keys]
+        self._sort_index = {}
+        resort = False
+        for row in range(self._loaded):
+            new_slot = self._view[row]
+            old_slot = old_slots[keys[new_slot]]
+            columns = [
+                column for column in range(len(self._columns))
+                if _changed_slots([old_data[column][old_slot]], [data[column][new_slot]], self._columns[column].numeric)
+            ]
+            if columns:
+                self.dataChanged.emit(self.index(row, columns[0]), self.index(row, columns[-1]))
+                resort = resort or self._sort_column in columns
+
+        # 删除了已暴露的行时，从未暴露的行中补足（至少一批），与 rowCount 和 total_count 保持一致
+        if self._loaded < loaded_before:
+            target = min(len(self._view), max(self._loaded, self.FETCH_BATCH))
+            if target > self._loaded:
+                self.beginInsertRows(QModelIndex(), self._loaded, target - 1)
+                self._loaded = target
+                self.endInsertRows()
+
+        # 追加新行
+        added = [slot for slot, key in enumerate(keys) if key not in old_slots]
+        if added:
+            self._append_to_view(added)
+            resort = True
+
+        # 保持排序或输入顺序
+        if self._sort_column is None:
+            self._apply_view(list(range(len(keys))))
+        elif resort:
+            self._apply_view(self._sorted_view())
+
+    def upsert_rows(self, records):
+        """
+        只更新或追加给定的行，不删除其他行（用于分批到达的刷新结果）
+        :param records: 行记录列表
+        """
+        changed_columns = {}
+        added = []
+        for record in records:
+            key = self._key(record)
+            cells = self._cell_values(record)
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = len(self._keys)
+                self._keys.append(key)
+                self._slots[key] = slot
+                for values, value in zip(self._data, cells):
+                    values.append(value)
+                added.append(slot)
+                continue
+            for column, (values, value) in enumerate(zip(self._data, cells)):
+                if _changed_slots([values[slot]], [value], self._columns[column].numeric):
+                    values[slot] = value
+                    changed_columns.setdefault(slot, []).append(column)
+
+        resort = False
+        for column in {column for columns in changed_columns.values() for column in columns}:
+            self._sort_index.pop(column, None)
+            resort = resort or column == self._sort_column
+        if changed_columns:
+            rows = self._rows_of()
+            for slot, columns in changed_columns.items():
+                row = rows[slot]
+                if row < self._loaded:
+                    self.dataChanged.emit(self.index(row, columns[0]), self.index(row, columns[-1]))
+
+        # 追加新行
+        if added:
+            self._sort_index = {}
+            self._append_to_view(added)
+            resort = True
+
+        if resort and self._sort_column is not None:
+            self._apply_view(self._sorted_view())
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """按列排序，空值始终排在最后；列号小于0时恢复输入顺序"""
+        if column < 0:
+            self._sort_column = None
+            self._apply_view(list(range(len(self._keys))))
+            return
+        self._sort_column = column
+        self._sort_order = order
+        self._apply_view(self._sorted_view())
+
+    def _sorted_view(self):
+        """
+        按当前排序列计算显示顺序，升序索引按列缓存，数据变化时失效
+        :return: 存储位置列表
+        """
+        column = self._sort_column
+        values = self._data[column]
+        if column not in self._sort_index:
+            if self._columns[column].numeric:
+                slots = [slot for slot in range(len(values)) if not math.isnan(values[slot])]
+            else:
+                slots = [slot for slot in range(len(values)) if values[slot] != '']
+            slots.sort(key=values.__getitem__)
+            self._sort_index[column] = slots
+        slots = self._sort_index[column]
+        if self._sort_order == Qt.DescendingOrder:
+            slots = slots[::-1]
+        if len(slots) == len(values):
+            return list(slots)
+        # 空值排在最后
+        present = set(slots)
+        return list(slots) + [slot for slot in range(len(values)) if slot not in present]
+
+    def _append_to_view(self, slots):
+        """
+        在显示顺序末尾追加行，之前已全部暴露时新行也直接暴露（不超过一批）
+        :param slots: 新行的存储位置
+        """
+        was_complete = self._loaded == len(self._view)
+        self._view.extend(slots)
+        target = max(self._loaded, min(len(self._view), self.FETCH_BATCH)) if was_complete else self._loaded
+        if target > self._loaded:
+            self.beginInsertRows(QModelIndex(), self._loaded, target - 1)
+            self._loaded = target
+            self.endInsertRows()
+
+    def _rows_of(self):
+        """
+        计算存储位置到行号的映射
+        :return: 列表，rows[slot] 为行号
+        """
+        rows = [0] * len(self._view)
+        for row, slot in enumerate(self._view):
+            rows[slot] = row
+        return rows
+
+    def _apply_view(self, view):
+        """
+        调整行顺序，同步更新持久索引以保留选中和当前项
+        :param view: 新的显示顺序
+        """
+        if view == self._view:
+            return
+        self.layoutAboutToBeChanged.emit()
+        old_view = self._view
+        self._view = view
+        rows = self._rows_of()
+        old_indexes = self.persistentIndexList()
+        new_indexes = []
+        for index in old_indexes:
+            row = rows[old_view[index.row()]]
+            # 移到未暴露范围的行失去选中
+            new_indexes.append(self.index(row, index.column()) if row < self._loaded else QModelIndex())
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+# 基金行情列：行记录为 (FundQuote, 预测收益)
+FUND_NAME_COLUMN = Column('基金名称', lambda row: row[0].name)
+FUND_CODE_COLUMN = Column('基金代码', lambda row: row[0].code)
+FUND_TYPE_COLUMN = Column('基金类型', lambda row: row[0].type)
+NET_VALUE_COLUMN = Column('单位净值', lambda row: row[0].net_value, format_net_value, numeric=True)
+DAY_GROWTH_COLUMN = Column('日涨跌幅', lambda row: row[0].day_growth, format_percent, growth_color, numeric=True)
+PREDICTED_COLUMN = Column('预测收益', lambda row: row[1], format_percent, growth_color, numeric=True)
+DATE_COLUMN = Column('更新日期', lambda row: row[0].date)
+STATUS_COLUMN = Column('状态', lambda row: row[0].error, format_status, status_color)
+
+def quote_row_key(row):
+    """基金行情行的键"""
+    return row[0].code
+
+def build_quote_rows(quotes, market_data=None):
+    """
+    批量预测收益并组装基金行情行
+    :param quotes: FundQuote列表
+    :param market_data: 市场数据，默认读取共享的大盘快照
+    :return: (FundQuote, 预测收益) 列表，没有净值的基金预测收益为None
+    """
+    from utils.profit_prediction import ProfitPrediction
+    
+    if not quotes:
+        return []
+    # 一次性预测所有基金的收益
+    predictions = ProfitPrediction().predict_quotes(quotes, market_data)
+    return [
+        (quote, None if quote.net_value is None else float(predicted))
+        for quote, predicted in zip(quotes, predictions)
+    ]
+
+class FundTableUpdater(QObject):
+    """把刷新线程分批发来的基金行情合并后写入表格模型，并显示刷新进度"""
+
+    COALESCE_INTERVAL = 100  # 界面合并更新的间隔（毫秒）
+
+    def __init__(self, model, progress_bar=None, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.progress_bar = progress_bar
+        self.pending = {}  # 基金代码 -> 尚未写入表格的行情
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.COALESCE_INTERVAL)
+        self.timer.timeout.connect(self.flush)
+        if self.progress_bar:
+            self.progress_bar.hide()
+
+    def attach(self, thread, jobs):
+        """
+        连接刷新线程的信号，旧任务迟到的结果被丢弃
+        :param thread: 已由 jobs 登记的 FundUpdateThread
+        :param jobs: RefreshJobRunner
+        """
+        self.reset()
+        thread.batch_signal.connect(jobs.guard(thread.generation, self.add_batch))
+        thread.progress_signal.connect(jobs.guard(thread.generation, self.update_progress))
+        thread.update_signal.connect(jobs.guard(thread.generation, self.finish))
+        self.update_progress(0, len(thread.fund_codes))
+
+    def reset(self):
+        """丢弃尚未写入的行情并隐藏进度"""
+        self.timer.stop()
+        self.pending.clear()
+        if self.progress_bar:
+            self.progress_bar.hide()
+
+    def add_batch(self, quotes):
+        """收到一批行情，合并到下次定时更新"""
+        for quote in quotes:
+            self.pending[quote.code] = quote
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        """将合并的行情写入表格"""
+        if self.pending:
+            quotes = list(self.pending.values())
+            self.pending.clear()
+            self.model.upsert_rows(build_quote_rows(quotes))
+
+    def show_cached(self, quotes):
+        """
+        显示本地保存的行情（刷新结果到达前），不影响刷新进度
+        :param quotes: FundQuote列表
+        """
+        self.model.update_rows(build_quote_rows(quotes))
+
+    def update_progress(self, done, total):
+        """更新刷新进度"""
+        if not self.progress_bar:
+            return
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        self.progress_bar.setVisible(done < total)
+
+    def finish(self, quotes):
+        """刷新完成，用完整结果校正表格（删除已移除的基金、恢复输入顺序）"""
+        self.timer.stop()
+        self.pending.clear()
+        self.model.update_rows(build_quote_rows(quotes))
+        if self.progress_bar:
+            self.progress_bar.hide()
+
+# 性能测试：大表格的增量更新、排序和内存占用
+if __name__ == '__main__':
+    import sys
+    import time
+    import tracemalloc
+    from PyQt5.QtCore import QCoreApplication
+    from api.fund_quote import FundQuote
+
+    app = QCoreApplication(sys.argv)
+
+    for fund_count in (10000, 50000):
+        model = FundTableModel(
+            [FUND_NAME_COLUMN, FUND_CODE_COLUMN, NET_VALUE_COLUMN, DAY_GROWTH_COLUMN, PREDICTED_COLUMN, DATE_COLUMN],
+            key=quote_row_key
+        )
+        changes = []
+        model.dataChanged.connect(lambda top_left, bottom_right: changes.append(top_left.row()))
+
+        rows = [
+            (FundQuote(f"{i:06d}", f"基金{i}", '混合型', 1.0 + i / 1e4, (i % 200) / 100 - 1, '2026-10-16', (0.1,) * 30), 0.1)
+            for i in range(fund_count)
+        ]
+        tracemalloc.start()
+        start = time.perf_counter()
+        model.update_rows(rows)
+        load_time = time.perf_counter() - start
+        model_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # 只修改其中50只基金的涨跌幅
+        updated = list(rows)
+        for i in range(0, fund_count, fund_count // 50):
+            quote, predicted = updated[i]
+            updated[i] = (quote._replace(day_growth=-0.5), predicted)
+        start = time.perf_counter()
+        model.update_rows(updated)
+        update_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model.sort(3, Qt.DescendingOrder)
+        sort_time = time.perf_counter() - start
+        start = time.perf_counter()
+        model.sort(3, Qt.AscendingOrder)
+        resort_time = time.perf_counter() - start
+
+        print(f"{fund_count} 行: 加载 {load_time * 1000:.1f} ms, 模型内存 {model_memory / 1024 / 1024:.1f} MB, "
+              f"暴露 {model.rowCount()} 行")
+        print(f"  更新 50 行: {update_time * 1000:.1f} ms, dataChanged {len(changes)} 次")
+        print(f"  首次排序: {sort_time * 1000:.1f} ms, 使用缓存索引反向排序: {resort_time * 1000:.1f} ms")
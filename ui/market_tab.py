@@ -5,18 +5,52 @@
 """
 
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, 
-    QTableWidgetItem, QHeaderView, QGridLayout, QLabel, QGroupBox,
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, 
+    QHeaderView, QGridLayout, QLabel, QGroupBox,
     QScrollArea, QSplitter
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QColor
+from datetime import datetime
+import time
 
 from api.fund_api import FundAPI
+from api.response_cache import CachedValue
+from database.db_manager import FundDB
+from ui.fund_table_model import Column, FundTableModel, format_rank
+from ui.refresh_jobs import RefreshThread, RefreshJobRunner
+from utils.market_snapshot import get_market_snapshot
+from utils.refresh_engine import subscribe_quotes
 
-class MarketUpdateThread(QThread):
+def format_age(seconds):
+    """
+    格式化数据已存在的时长
+    :param seconds: 秒数
+    :return: 如 刚刚、5分钟前、2小时前
+    """
+    if seconds < 60:
+        return '刚刚'
+    if seconds < 3600:
+        return f"{int(seconds // 60)}分钟前"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)}小时前"
+    return f"{int(seconds // 86400)}天前"
+
+def format_update_time(timestamp, stale):
+    """
+    格式化数据获取时间，过期时注明
+    :param timestamp: time.time() 格式的时间
+    :param stale: 是否已过期
+    :return: 如 10:31:05（5分钟前，已过期）
+    """
+    moment = datetime.fromtimestamp(timestamp)
+    text = moment.strftime('%H:%M:%S' if moment.date() == datetime.now().date() else '%m-%d %H:%M')
+    if stale:
+        text += f"（{format_age(time.time() - timestamp)}，已过期）"
+    return text
+
+class MarketUpdateThread(RefreshThread):
     """市场数据更新线程"""
-    market_index_signal = pyqtSignal(dict)
     market_sentiment_signal = pyqtSignal(dict)
     fund_rank_signal = pyqtSignal(dict)
     
@@ -25,27 +59,54 @@ class MarketUpdateThread(QThread):
         self.api = FundAPI()
     
     def run(self):
-        # 获取大盘指数
-        market_index = self.api.get_market_index()
-        self.market_index_signal.emit(market_index)
+        # 获取大盘指数并发布到共享快照，界面通过订阅快照更新
+        get_market_snapshot().refresh(self.api)
+        if self.is_cancelled():
+            return
         
         # 获取市场情绪
         market_sentiment = self.api.get_market_sentiment()
+        if self.is_cancelled():
+            return
         self.market_sentiment_signal.emit(market_sentiment)
         
-        # 获取基金排行榜
+        # 获取基金排行榜（自选榜、持有榜由本地数据计算），接口失败时为最近一次的数据
         fund_rank = {
-            '涨幅榜': self.api.get_fund_rank('涨跌幅'),
-            '自选榜': self.api.get_fund_rank('涨跌幅'),  # 暂时使用涨幅榜数据
-            '持有榜': self.api.get_fund_rank('涨跌幅')   # 暂时使用涨幅榜数据
+            '涨幅榜': self.api.fetch_fund_rank('涨跌幅')
         }
+        if self.is_cancelled():
+            return
         self.fund_rank_signal.emit(fund_rank)
 
 class MarketTab(QWidget):
     """行情模块界面"""
+    market_snapshot_signal = pyqtSignal(dict)
+    quote_signal = pyqtSignal(object)
+    
     def __init__(self):
         super().__init__()
+        self.refresh_jobs = RefreshJobRunner(self)
+        self.add_threads = set()  # 运行中的添加自选线程，结束前保留引用
         self.init_ui()
+        
+        # 基金行情更新后重新计算本地榜单，短时间内的多次更新合并为一次
+        self.local_board_timer = QTimer(self)
+        self.local_board_timer.setSingleShot(True)
+        self.local_board_timer.setInterval(300)
+        self.local_board_timer.timeout.connect(self.update_local_boards)
+        self.quote_signal.connect(self.local_board_timer.start)
+        subscribe_quotes(self.quote_signal.emit)
+        
+        # 订阅共享大盘快照，快照可能在后台线程发布，通过信号转到界面线程
+        self.market_snapshot_signal.connect(self.update_market_index)
+        get_market_snapshot().subscribe(self.market_snapshot_signal.emit)
+        
+        # 先显示本地保存的数据，网络刷新在窗口显示后由 start_background_tasks 启动
+        self.show_cached_data()
+        self.update_local_boards()
+    
+    def start_background_tasks(self):
+        """启动后台任务：刷新行情数据"""
         self.refresh_data()
     
     def init_ui(self):
@@ -57,6 +118,8 @@ class MarketTab(QWidget):
         self.refresh_btn = QPushButton('刷新数据')
         self.refresh_btn.clicked.connect(self.refresh_data)
         top_layout.addWidget(self.refresh_btn)
+        self.snapshot_time_label = QLabel('指数更新时间: --')
+        top_layout.addWidget(self.snapshot_time_label)
         self.layout.addLayout(top_layout)
         
         # 主分割器
@@ -136,27 +199,31 @@ class MarketTab(QWidget):
         ranking_layout = QHBoxLayout(ranking_group)
         
         # 排行榜分类
-        ranking_categories = {
-            '热搜榜': ['序号', '基金名称', '基金代码'],
-            '涨幅榜': ['序号', '基金名称', '基金代码'],
-            '自选榜': ['序号', '基金名称', '基金代码'],
-            '持有榜': ['序号', '基金名称', '基金代码']
-        }
+        ranking_categories = ['热搜榜', '涨幅榜', '自选榜', '持有榜']
         
-        # 存储所有排行榜表格
+        # 排行榜列：行记录为带序号的基金字典
+        rank_columns = [
+            Column('序号', lambda fund: fund['rank'], format_rank, numeric=True),
+            Column('基金名称', lambda fund: fund.get('name', '')),
+            Column('基金代码', lambda fund: fund.get('code', ''))
+        ]
+        
+        # 存储所有排行榜表格和网络榜单的更新时间标签
         self.rank_tables = {}
+        self.rank_time_labels = {}
         
-        for category, headers in ranking_categories.items():
+        for category in ranking_categories:
             # 创建分类组
             category_group = QGroupBox(category)
             category_layout = QVBoxLayout(category_group)
             # 设置垂直方向的对齐方式为顶部
             category_layout.setAlignment(Qt.AlignTop)
             
-            # 创建表格
-            table = QTableWidget()
-            table.setColumnCount(len(headers))
-            table.setHorizontalHeaderLabels(headers)
+            # 创建表格，刷新时按基金代码增量更新
+            table = QTableView()
+            table.setModel(FundTableModel(rank_columns, parent=table))
+            table.setSelectionBehavior(QTableView.SelectRows)
+            table.setEditTriggers(QTableView.NoEditTriggers)
             # 隐藏垂直表头（行号）
             table.verticalHeader().setVisible(False)
             # 设置列宽
@@ -170,6 +237,10 @@ class MarketTab(QWidget):
             self.rank_tables[category] = table
             
             category_layout.addWidget(table)
+            time_label = QLabel('')
+            time_label.setStyleSheet('color: gray')
+            self.rank_time_labels[category] = time_label
+            category_layout.addWidget(time_label)
             ranking_layout.addWidget(category_group, 1)
         
         main_splitter.addWidget(ranking_group)
@@ -178,15 +249,49 @@ class MarketTab(QWidget):
     
     def refresh_data(self):
         """刷新数据"""
-        # 启动线程更新市场数据
-        self.update_thread = MarketUpdateThread()
-        self.update_thread.market_index_signal.connect(self.update_market_index)
-        self.update_thread.market_sentiment_signal.connect(self.update_market_sentiment)
-        self.update_thread.fund_rank_signal.connect(self.update_fund_rank)
-        self.update_thread.start()
+        # 启动线程更新市场数据，取代仍在运行的旧任务，旧任务迟到的结果被丢弃
+        update_thread = MarketUpdateThread()
+        generation = self.refresh_jobs.supersede(update_thread)
+        update_thread.market_sentiment_signal.connect(self.refresh_jobs.guard(generation, self.update_market_sentiment))
+        update_thread.fund_rank_signal.connect(self.refresh_jobs.guard(generation, self.update_fund_rank))
+        update_thread.start()
+        
+        self.update_local_boards()
+    
+    def auto_refresh(self):
+        """自动刷新（由刷新调度器调用，上次刷新未完成时跳过）"""
+        if self.refresh_jobs.is_running():
+            return
+        self.refresh_data()
+    
+    def show_cached_data(self):
+        """显示本地保存的大盘指数和排行榜（不发起网络请求）"""
+        market_index = get_market_snapshot().get()
+        if market_index:
+            self.update_market_index(market_index)
+        cached_rank = FundAPI().get_cached_fund_rank('涨跌幅')
+        if cached_rank:
+            self.update_fund_rank({'涨幅榜': cached_rank})
+    
+    def update_local_boards(self):
+        """根据本地自选、组合和最新净值计算自选榜、持有榜"""
+        db = FundDB()
+        fund_rank = {
+            '自选榜': db.get_favorite_board(),
+            '持有榜': db.get_holding_board()
+        }
+        db.close()
+        # 本地榜单为空表示已没有自选或持有的基金，直接清空表格
+        for rank_type, funds in fund_rank.items():
+            self._update_rank_table(rank_type, funds)
     
     def update_market_index(self, market_index):
-        """更新大盘指数"""
+        """更新大盘指数，接口失败时显示的旧数据标记为过期"""
+        snapshot = get_market_snapshot()
+        timestamp = snapshot.timestamp
+        if timestamp:
+            self.snapshot_time_label.setText(f"指数更新时间: {format_update_time(timestamp, snapshot.is_stale())}")
+        
         for index_name, data in market_index.items():
             if index_name in self.market_index_labels:
                 price = data.get('price', 0)
@@ -195,10 +300,17 @@ class MarketTab(QWidget):
                 # 设置颜色
                 color = QColor('red') if change_percent > 0 else QColor('green') if change_percent < 0 else QColor('black')
                 
+                # 本次未获取到、沿用旧数据的指数显示为灰色
+                update_time = data.get('update_time')
+                stale = update_time is not None and time.time() - update_time > snapshot.max_age
+                if stale:
+                    color = QColor('gray')
+                
                 # 更新标签
                 label = self.market_index_labels[index_name]
                 label.setText(f"{price:.2f} ({change_percent:+.2f}%)")
                 label.setStyleSheet(f"color: {color.name()}")
+                label.setToolTip(f"更新时间: {format_update_time(update_time, stale)}" if update_time else '')
     
     def update_market_sentiment(self, market_sentiment):
         """更新市场情绪"""
@@ -246,79 +358,43 @@ class MarketTab(QWidget):
             ]
         
         # 填充热搜榜表格
-        if '热搜榜' in self.rank_tables:
-            table = self.rank_tables['热搜榜']
-            table.setRowCount(len(hot_funds))
-            
-            for row, fund in enumerate(hot_funds):
-                # 序号
-                index_item = QTableWidgetItem(str(row + 1))
-                table.setItem(row, 0, index_item)
-                
-                # 基金名称
-                name_item = QTableWidgetItem(fund.get('name', ''))
-                table.setItem(row, 1, name_item)
-                
-                # 基金代码
-                code_item = QTableWidgetItem(fund.get('code', ''))
-                table.setItem(row, 2, code_item)
-        
-        # 为其他榜单也填充相同的数据
-        for table_name in ['涨幅榜', '自选榜', '持有榜']:
-            if table_name in self.rank_tables:
-                table = self.rank_tables[table_name]
-                table.setRowCount(len(hot_funds))
-                
-                for row, fund in enumerate(hot_funds):
-                    # 序号
-                    index_item = QTableWidgetItem(str(row + 1))
-                    table.setItem(row, 0, index_item)
-                    
-                    # 基金名称
-                    name_item = QTableWidgetItem(fund.get('name', ''))
-                    table.setItem(row, 1, name_item)
-                    
-                    # 基金代码
-                    code_item = QTableWidgetItem(fund.get('code', ''))
-                    table.setItem(row, 2, code_item)
+        self._update_rank_table('热搜榜', hot_funds)
     
     def update_fund_rank(self, fund_rank):
-        """更新基金排行榜"""
+        """
+        更新基金排行榜
+        :param fund_rank: {榜单名称: 基金列表}，来自网络的榜单为 CachedValue，并显示其更新时间
+        """
         for rank_type, funds in fund_rank.items():
-            if rank_type in self.rank_tables:
-                table = self.rank_tables[rank_type]
-                
-                # 只有当有数据时才更新，否则保留原有数据
-                if funds:
-                    table.setRowCount(len(funds))
-                    
-                    for row, fund in enumerate(funds):
-                        # 序号
-                        index_item = QTableWidgetItem(str(row + 1))
-                        table.setItem(row, 0, index_item)
-                        
-                        # 基金名称
-                        name_item = QTableWidgetItem(fund.get('name', ''))
-                        table.setItem(row, 1, name_item)
-                        
-                        # 基金代码
-                        code_item = QTableWidgetItem(fund.get('code', ''))
-                        table.setItem(row, 2, code_item)
-                # 如果没有数据，不做任何操作，保留之前的模拟数据
+            if isinstance(funds, CachedValue):
+                if rank_type in self.rank_time_labels:
+                    self.rank_time_labels[rank_type].setText(f"更新时间: {format_update_time(funds.update_time, funds.stale)}")
+                funds = funds.value
+            # 网络榜单只有当有数据时才更新，否则保留原有数据
+            if funds:
+                self._update_rank_table(rank_type, funds)
+    
+    def _update_rank_table(self, rank_type, funds):
+        """
+        增量更新排行榜表格，只重绘变化的单元格
+        :param rank_type: 排行榜名称
+        :param funds: 基金列表（按排名顺序）
+        """
+        if rank_type in self.rank_tables:
+            model = self.rank_tables[rank_type].model()
+            model.update_rows([dict(fund, rank=row + 1) for row, fund in enumerate(funds)])
     
     def show_rank_context_menu(self, position, table):
         """显示排行榜上下文菜单"""
-        # 获取当前选中的项
-        selected_items = table.selectedItems()
-        if not selected_items:
+        # 获取点击位置的行
+        index = table.indexAt(position)
+        if not index.isValid():
             return
         
-        # 获取选中行
-        row = selected_items[0].row()
-        
         # 获取基金代码和名称
-        fund_code = table.item(row, 2).text()
-        fund_name = table.item(row, 1).text()
+        model = table.model()
+        fund_code = model.key(index.row())
+        fund_name = model.value(index.row(), 1)
         
         # 创建上下文菜单
         from PyQt5.QtWidgets import QMenu
@@ -333,24 +409,25 @@ class MarketTab(QWidget):
     
     def add_fund_to_favorite(self, fund_code, fund_name):
         """添加基金到自选"""
-        from database.db_manager import FundDB
-        from api.fund_api import FundAPI
-        
-        # 验证基金代码是否有效
-        api = FundAPI()
-        fund_info = api.get_fund_info(fund_code)
-        if not fund_info:
-            from PyQt5.QtWidgets import QMessageBox
-            QMessageBox.error(self, '错误', f'基金 {fund_name} 不存在')
-            return
-        
-        # 添加到数据库
-        db = FundDB()
-        success = db.add_favorite_fund(fund_code, fund_info['name'], fund_info['type'])
-        db.close()
-        
+        from ui.favorite_tab import FavoriteAddThread
+        
+        # 后台验证并添加，避免阻塞界面；连续添加时每个线程在结束前都保留引用
+        add_thread = FavoriteAddThread([fund_code])
+        add_thread.finished_signal.connect(
+            lambda added, invalid_codes: self.on_favorite_fund_added(fund_name, added, invalid_codes)
+        )
+        add_thread.finished.connect(lambda: self.add_threads.discard(add_thread))
+        self.add_threads.add(add_thread)
+        add_thread.start()
+    
+    def on_favorite_fund_added(self, fund_name, added, invalid_codes):
+        """添加基金到自选完成"""
         from PyQt5.QtWidgets import QMessageBox
-        if success:
-            QMessageBox.information(self, '成功', f'基金 {fund_info["name"]} 已添加到自选')
+        
+        if invalid_codes:
+            QMessageBox.critical(self, '错误', f'基金 {fund_name} 不存在')
+        elif added:
+            QMessageBox.information(self, '成功', f'基金 {fund_name} 已添加到自选')
+            self.update_local_boards()
         else:
-            QMessageBox.warning(self, '提示', f'基金 {fund_info["name"]} 已在自选列表中')
+            QMessageBox.warning(self, '提示', f'基金 {fund_name} 已在自选列表中')
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+刷新任务管理：新任务取代旧任务，旧任务被取消且结果被丢弃
+"""
+
+import threading
+
+from PyQt5.QtCore import QObject, QThread
+
+class RefreshThread(QThread):
+    """可取消的刷新线程，run 中应在耗时步骤之间检查 is_cancelled"""
+
+    def __init__(self):
+        super().__init__()
+        self.cancel_event = threading.Event()
+        self.generation = 0  # 由 RefreshJobRunner 分配的任务代次
+
+    def cancel(self):
+        """请求取消（协作式：正在进行的请求完成后停止）"""
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        """是否已请求取消"""
+        return self.cancel_event.is_set()
+
+class RefreshJobRunner(QObject):
+    """
+    刷新任务运行器，同一时间只有最新的任务有效：
+    提交新任务时取消正在运行的旧任务，界面通过 is_current 丢弃旧任务迟到的结果。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.generation = 0
+        self.current = None
+        self._retired = set()  # 已取消但尚未退出的线程，保留引用直到线程结束
+
+    def supersede(self, thread):
+        """
+        登记新任务并取消旧任务，调用方连接信号后再启动线程
+        :param thread: RefreshThread
+        :return: 新任务的代次
+        """
+        self.cancel()
+        thread.generation = self.generation
+        self.current = thread
+        return thread.generation
+
+    def start(self, thread):
+        """
+        登记并启动新任务
+        :param thread: RefreshThread
+        :return: 新任务的代次
+        """
+        generation = self.supersede(thread)
+        thread.start()
+        return generation
+
+    def cancel(self):
+        """取消当前任务，之后到达的旧结果都会被丢弃"""
+        self.generation += 1
+        previous, self.current = self.current, None
+        if previous is not None and previous.isRunning():
+            previous.cancel()
+            self._retired.add(previous)
+            previous.finished.connect(self._on_retired_finished)
+            # 连接信号前线程可能已经结束
+            if previous.isFinished():
+                self._retired.discard(previous)
+
+    def _on_retired_finished(self):
+        """已取消的线程结束后释放引用"""
+        self._retired.discard(self.sender())
+
+    def is_current(self, generation):
+        """
+        判断代次是否为最新任务
+        :param generation: 任务代次
+        :return: 是否最新
+        """
+        return generation == self.generation
+
+    def is_running(self):
+        """当前任务是否在运行"""
+        return self.current is not None and self.current.isRunning()
+
+    def guard(self, generation, slot):
+        """
+        包装信号槽，只在任务仍为最新时调用
+        :param generation: 任务代次
+        :param slot: 原槽函数
+        :return: 包装后的函数
+        """
+        def guarded(*args):
+            if self.is_current(generation):
+                slot(*args)
+        return guarded
@@ -7,39 +7,47 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, 
     QListWidget, QListWidgetItem, QLabel, QMessageBox, QSplitter, QWidget as QWidge,
-    QMenu
+    QMenu, QTableView, QHeaderView, QProgressBar
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt, pyqtSignal
 
 from api.fund_api import FundAPI
 from database.db_manager import FundDB
+from utils.refresh_engine import FundRefreshEngine
+from utils.market_snapshot import get_market_snapshot
+from ui.refresh_jobs import RefreshThread, RefreshJobRunner
+from ui.fund_table_model import (
+    FundTableModel, FundTableUpdater, quote_row_key, FUND_NAME_COLUMN, FUND_CODE_COLUMN,
+    NET_VALUE_COLUMN, DAY_GROWTH_COLUMN, PREDICTED_COLUMN, DATE_COLUMN, STATUS_COLUMN
+)
 
-class FundUpdateThread(QThread):
+class FundUpdateThread(RefreshThread):
     """基金数据更新线程"""
-    update_signal = pyqtSignal(list)
+    update_signal = pyqtSignal(list)  # 全部完成：按输入顺序的完整结果
+    batch_signal = pyqtSignal(list)  # 分批到达的结果
+    progress_signal = pyqtSignal(int, int)  # 已完成数，总数
     
     def __init__(self, fund_codes):
         super().__init__()
         self.fund_codes = fund_codes
-        self.api = FundAPI()
+        self.engine = FundRefreshEngine()
     
     def run(self):
-        fund_data_list = []
-        for code in self.fund_codes:
-            fund_info = self.api.get_fund_info(code)
-            fund_net_value = self.api.get_fund_net_value(code)
-            if fund_info and fund_net_value:
-                fund_data = {
-                    'code': code,
-                    'name': fund_info['name'],
-                    'type': fund_info['type'],
-                    'net_value': fund_net_value['net_value'],
-                    'day_growth': fund_net_value['day_growth'],
-                    'date': fund_net_value['date']
-                }
-                fund_data_list.append(fund_data)
-        self.update_signal.emit(fund_data_list)
+        # 与基金数据并行获取大盘快照，界面线程只读取快照
+        market_snapshot = get_market_snapshot()
+        market_snapshot.refresh_async()
+        quotes = self.engine.refresh(self.fund_codes, batch_callback=self._on_batch, cancel_event=self.cancel_event)
+        if self.is_cancelled():
+            return
+        market_snapshot.ensure_fresh()
+        self.update_signal.emit(quotes)
+    
+    def _on_batch(self, quotes, done_count):
+        """一批基金刷新完成"""
+        if self.is_cancelled():
+            return
+        self.batch_signal.emit(list(quotes))
+        self.progress_signal.emit(done_count, len(self.fund_codes))
 
 class RefreshTab(QWidget):
     """刷新模块界面"""
@@ -95,6 +103,12 @@ class RefreshTab(QWidget):
         self.refresh_btn.clicked.connect(self.refresh_data)
         right_top_layout.addWidget(self.refresh_btn)
         
+        # 刷新进度
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat('%v/%m')
+        self.progress_bar.setMaximumWidth(160)
+        right_top_layout.addWidget(self.progress_bar)
+        
         # 设置布局比例，与底部保持一致
         top_layout.addWidget(left_top_widget, 1)
         top_layout.addWidget(right_top_widget, 3)
@@ -115,9 +129,22 @@ class RefreshTab(QWidget):
         self.portfolio_list.customContextMenuRequested.connect(self.show_portfolio_context_menu)
         bottom_layout.addWidget(self.portfolio_list, 1)
         
-        # 右侧基金列表（占3/4宽度）
-        self.fund_list = QListWidget()
-        bottom_layout.addWidget(self.fund_list, 3)
+        # 右侧基金表格（占3/4宽度），刷新时按基金代码增量更新
+        self.fund_model = FundTableModel([
+            FUND_NAME_COLUMN, FUND_CODE_COLUMN, NET_VALUE_COLUMN,
+            DAY_GROWTH_COLUMN, PREDICTED_COLUMN, DATE_COLUMN, STATUS_COLUMN
+        ], key=quote_row_key, parent=self)
+        self.fund_updater = FundTableUpdater(self.fund_model, self.progress_bar, self)
+        # 刷新任务：切换组合或再次刷新时取消旧任务
+        self.refresh_jobs = RefreshJobRunner(self)
+        self.fund_table = QTableView()
+        self.fund_table.setModel(self.fund_model)
+        self.fund_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.fund_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.fund_table.setSortingEnabled(True)
+        self.fund_table.setSelectionBehavior(QTableView.SelectRows)
+        self.fund_table.setEditTriggers(QTableView.NoEditTriggers)
+        bottom_layout.addWidget(self.fund_table, 3)
         
         self.layout.addWidget(bottom_widget)
         
@@ -139,6 +166,8 @@ class RefreshTab(QWidget):
     def select_portfolio(self, item):
         """选择组合"""
         self.current_portfolio = item.data(Qt.UserRole)
+        # 切换组合时清空表格，同一组合内刷新则增量更新
+        self.fund_model.clear()
         self.load_portfolio_funds()
     
     def load_portfolio_funds(self):
@@ -146,58 +175,22 @@ class RefreshTab(QWidget):
         if not self.current_portfolio:
             return
         
-        self.fund_list.clear()
         fund_codes = self.current_portfolio['fund_codes']
         
-        if fund_codes:
-            # 启动线程更新基金数据
-            self.update_thread = FundUpdateThread(fund_codes)
-            self.update_thread.update_signal.connect(self.update_fund_list)
-            self.update_thread.start()
-    
-    def update_fund_list(self, fund_data_list):
-        """更新基金列表"""
-        self.fund_list.clear()
-        from utils.profit_prediction import ProfitPrediction
-        from api.fund_api import FundAPI
-        
-        predictor = ProfitPrediction()
-        api = FundAPI()
-        market_data = api.get_market_index()
-        
-        for fund_data in fund_data_list:
-            item = QListWidgetItem(f"{fund_data['name']} ({fund_data['code']})")
-            item.setData(Qt.UserRole, fund_data)
-            
-            # 根据涨跌幅设置颜色
-            day_growth = fund_data['day_growth']
-            if day_growth.startswith('+'):
-                item.setForeground(QColor('red'))
-            elif day_growth.startswith('-'):
-                item.setForeground(QColor('green'))
-            
-            # 预测收益
-            predicted_profit = predictor.predict_daily_profit([fund_data], market_data)
-            
-            # 添加子项显示详细信息
-            net_value_item = QListWidgetItem(f"单位净值: {fund_data['net_value']}")
-            day_growth_item = QListWidgetItem(f"日涨跌幅: {fund_data['day_growth']}%")
-            predicted_item = QListWidgetItem(f"预测收益: {predicted_profit:+.2f}%")
-            date_item = QListWidgetItem(f"更新日期: {fund_data['date']}")
-            
-            # 设置预测收益颜色
-            if predicted_profit > 0:
-                predicted_item.setForeground(QColor('red'))
-            elif predicted_profit < 0:
-                predicted_item.setForeground(QColor('green'))
-            
-            item.addChild(net_value_item)
-            item.addChild(day_growth_item)
-            item.addChild(predicted_item)
-            item.addChild(date_item)
+        if not fund_codes:
+            self.refresh_jobs.cancel()
+            self.fund_updater.reset()
+            self.fund_model.clear()
+        else:
+            # 切换组合后先显示本地保存的数据
+            if not self.fund_model.total_count():
+                self.fund_updater.show_cached(FundRefreshEngine().load_local(fund_codes))
             
-            self.fund_list.addItem(item)
-            item.setExpanded(True)
+            # 启动线程更新基金数据，取代仍在运行的旧任务
+            update_thread = FundUpdateThread(fund_codes)
+            self.refresh_jobs.supersede(update_thread)
+            self.fund_updater.attach(update_thread, self.refresh_jobs)
+            update_thread.start()
     
     def add_portfolio(self):
         """添加组合"""
@@ -213,13 +206,10 @@ class RefreshTab(QWidget):
         
         # 检查组合名称是否已存在
         db = FundDB()
-        portfolios = db.get_portfolios()
-        
-        for portfolio in portfolios:
-            if portfolio['name'] == portfolio_name:
-                QMessageBox.warning(self, '提示', '组合名称已存在，请使用其他名称')
-                db.close()
-                return
+        if db.portfolio_name_exists(portfolio_name):
+            QMessageBox.warning(self, '提示', '组合名称已存在，请使用其他名称')
+            db.close()
+            return
         
         portfolio_id = db.add_portfolio(portfolio_name)
         db.close()
@@ -270,6 +260,12 @@ class RefreshTab(QWidget):
         self.load_portfolio_funds()
         QMessageBox.information(self, '成功', '数据刷新完成')
     
+    def auto_refresh(self):
+        """自动刷新（由刷新调度器调用，不弹出提示，上次刷新未完成时跳过）"""
+        if not self.current_portfolio or self.refresh_jobs.is_running():
+            return
+        self.load_portfolio_funds()
+    
     def show_portfolio_context_menu(self, position):
         """显示组合上下文菜单"""
         # 获取当前点击的项
@@ -305,13 +301,10 @@ class RefreshTab(QWidget):
         if ok and new_name.strip():
             # 检查新名称是否已存在
             db = FundDB()
-            portfolios = db.get_portfolios()
-            
-            for p in portfolios:
-                if p['name'] == new_name.strip() and p['id'] != portfolio['id']:
-                    QMessageBox.warning(self, '提示', '组合名称已存在，请使用其他名称')
-                    db.close()
-                    return
+            if db.portfolio_name_exists(new_name.strip(), portfolio['id']):
+                QMessageBox.warning(self, '提示', '组合名称已存在，请使用其他名称')
+                db.close()
+                return
             
             # 更新组合名称
             success = db.update_portfolio_name(portfolio['id'], new_name.strip())
@@ -350,7 +343,9 @@ class RefreshTab(QWidget):
                 # 如果删除的是当前选中的组合，清空右侧基金列表
                 if self.current_portfolio and self.current_portfolio['id'] == portfolio['id']:
                     self.current_portfolio = None
-                    self.fund_list.clear()
+                    self.refresh_jobs.cancel()
+                    self.fund_updater.reset()
+                    self.fund_model.clear()
                 
                 QMessageBox.information(self, '成功', '组合删除成功')
             else:
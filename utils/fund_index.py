@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地基金搜索索引
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from api.fund_api import FundAPI
+from database.db_manager import FundDB
+
+class FundIndex:
+    """全部基金的内存搜索索引，支持代码、名称、拼音首字母和全拼查询"""
+
+    SYNC_CACHE_KEY = 'fund_universe_sync_time'
+    SYNC_INTERVAL = 24 * 3600  # 基金列表同步间隔（秒）
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._funds = []
+        self._haystack = ''
+        self._starts = []
+        self._code_keys = []
+        self._abbr_keys = []
+
+    def __len__(self):
+        return len(self._funds)
+
+    def load(self, funds=None):
+        """
+        构建索引
+        :param funds: 基金列表，为None时从数据库读取
+        """
+        if funds is None:
+            db = FundDB()
+            funds = db.get_fund_universe()
+            db.close()
+
+        funds = sorted(funds, key=lambda fund: fund['code'])
+
+        # 每只基金一行，子串查询直接在整段文本上查找
+        lines = []
+        starts = []
+        position = 0
+        for fund in funds:
+            line = f"{fund['code']}\t{fund['pinyin_abbr']}\t{fund['name']}\t{fund['pinyin']}\n".upper()
+            starts.append(position)
+            lines.append(line)
+            position += len(line)
+
+        code_keys = [fund['code'] for fund in funds]
+        abbr_keys = sorted((fund['pinyin_abbr'].upper(), i) for i, fund in enumerate(funds))
+
+        with self._lock:
+            self._funds = funds
+            self._haystack = ''.join(lines)
+            self._starts = starts
+            self._code_keys = code_keys
+            self._abbr_keys = abbr_keys
+
+    def search(self, text, limit=50):
+        """
+        搜索基金，依次返回代码前缀、拼音首字母前缀、其余包含匹配的结果
+        :param text: 搜索内容
+        :param limit: 最多返回数量
+        :return: 基金列表
+        """
+        query = text.strip().upper()
+        if not query or '\t' in query or '\n' in query:
+            return []
+
+        with self._lock:
+            funds = self._funds
+            haystack = self._haystack
+            starts = self._starts
+            code_keys = self._code_keys
+            abbr_keys = self._abbr_keys
+
+        matched = []
+        seen = set()
+
+        def add(index):
+            if index not in seen:
+                seen.add(index)
+                matched.append(index)
+            return len(matched) >= limit
+
+        # 代码前缀
+        start = bisect_left(code_keys, query)
+        end = bisect_right(code_keys, query + '\uffff')
+        for index in range(start, min(end, start + limit)):
+            if add(index):
+                return [funds[i] for i in matched]
+
+        # 拼音首字母前缀
+        start = bisect_left(abbr_keys, (query,))
+        end = bisect_left(abbr_keys, (query + '\uffff',))
+        for key in abbr_keys[start:min(end, start + limit)]:
+            if add(key[1]):
+                return [funds[i] for i in matched]
+
+        # 名称、全拼等包含匹配
+        position = haystack.find(query)
+        while position != -1:
+            index = bisect_right(starts, position) - 1
+            if add(index):
+                break
+            next_start = starts[index + 1] if index + 1 < len(starts) else len(haystack)
+            position = haystack.find(query, next_start)
+
+        return [funds[i] for i in matched]
+
+    def last_sync_time(self):
+        """
+        获取上次同步时间
+        :return: time.time()时间戳，从未同步返回None
+        """
+        db = FundDB()
+        _, update_time = db.get_cache(self.SYNC_CACHE_KEY)
+        db.close()
+        return update_time
+
+    def needs_sync(self):
+        """判断是否需要重新同步基金列表"""
+        last_sync = self.last_sync_time()
+        return last_sync is None or time.time() - last_sync > self.SYNC_INTERVAL
+
+    def sync(self, api=None):
+        """
+        从网络增量同步基金列表并重建索引（阻塞，只能在后台线程调用）
+        :param api: FundAPI实例
+        :return: 写入的基金数量，失败返回None
+        """
+        with self._sync_lock:
+            funds = (api or FundAPI()).get_fund_list()
+            if not funds:
+                return None
+
+            db = FundDB()
+            changed = db.sync_fund_universe(funds)
+            if changed is not None:
+                db.set_cache(self.SYNC_CACHE_KEY, str(len(funds)))
+            db.close()
+
+            if changed or len(funds) != len(self._funds):
+                self.load(funds)
+            return changed
+
+# 全局共享的基金搜索索引
+_fund_index = FundIndex()
+
+def get_fund_index():
+    """获取全局共享的基金搜索索引"""
+    return _fund_index
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大盘指数快照服务
+"""
+
+import threading
+import time
+
+from api.fund_api import FundAPI
+
+def data_timestamp(data):
+    """
+    获取指数数据的时间：各指数获取时间中最早的一个，部分指数沿用旧数据时快照按最旧的指数判断是否过期
+    :param data: 指数数据字典
+    :return: time.time() 格式的时间，没有记录时为当前时间
+    """
+    times = [quote.get('update_time') for quote in data.values() if quote.get('update_time')]
+    return min(times) if times else time.time()
+
+class MarketSnapshot:
+    """大盘指数快照，后台获取一次后供所有界面和收益预测共享读取"""
+
+    def __init__(self, max_age=60):
+        self.max_age = max_age  # 快照有效期（秒）
+        self._data = {}
+        self._timestamp = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        self._listeners = []
+        self._loaded = False
+
+    def load_cached(self):
+        """读取本地保存的最近一次大盘指数作为初始快照（不发起网络请求，只读取一次）"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+        cached = FundAPI().get_cached_market_index()
+        if cached and cached.value:
+            with self._lock:
+                if self._timestamp is None:
+                    self._data = cached.value
+                    self._timestamp = data_timestamp(cached.value)
+
+    def get(self):
+        """
+        获取当前快照数据（不发起网络请求），尚未获取时使用本地保存的最近一次数据
+        :return: 指数数据字典，从未获取过时为空字典
+        """
+        self.load_cached()
+        with self._lock:
+            return self._data
+
+    @property
+    def timestamp(self):
+        """快照数据的获取时间（time.time()），没有数据时为None"""
+        self.load_cached()
+        with self._lock:
+            return self._timestamp
+
+    def age(self):
+        """
+        获取快照已存在的时长
+        :return: 秒数，尚未获取时为None
+        """
+        timestamp = self.timestamp
+        if timestamp is None:
+            return None
+        return time.time() - timestamp
+
+    def is_stale(self, max_age=None):
+        """
+        判断快照是否过期
+        :param max_age: 有效期（秒），默认使用self.max_age
+        :return: 是否需要刷新
+        """
+        age = self.age()
+        return age is None or age > (self.max_age if max_age is None else max_age)
+
+    def publish(self, data):
+        """
+        发布新的快照并通知订阅者，接口失败时发布的旧数据保持其原有的获取时间
+        :param data: 指数数据字典
+        """
+        if not data:
+            return
+        with self._lock:
+            self._data = data
+            self._timestamp = data_timestamp(data)
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(data)
+            except Exception as e:
+                print(f"通知大盘快照订阅者失败: {e}")
+
+    def subscribe(self, callback):
+        """
+        订阅快照更新，回调可能在后台线程中执行
+        :param callback: callback(data)
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        """取消订阅快照更新"""
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def refresh(self, api=None):
+        """
+        获取最新大盘指数并发布（阻塞，只能在后台线程调用）
+        同一时间只有一个获取请求，其余调用等待其完成后直接复用结果
+        :param api: FundAPI实例
+        :return: 指数数据字典
+        """
+        timestamp = self.timestamp
+        with self._refresh_lock:
+            # 等待期间其他线程已完成刷新
+            if self.timestamp != timestamp and not self.is_stale():
+                return self.get()
+            data = (api or FundAPI()).get_market_index()
+            self.publish(data)
+        return self.get()
+
+    def ensure_fresh(self, max_age=None, api=None):
+        """
+        快照过期时刷新（阻塞，只能在后台线程调用）
+        :return: 指数数据字典
+        """
+        if self.is_stale(max_age):
+            return self.refresh(api)
+        return self.get()
+
+    def refresh_async(self, max_age=None):
+        """快照过期时在后台线程刷新，立即返回"""
+        if not self.is_stale(max_age):
+            return
+        with self._lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+            self._refresh_thread.start()
+
+# 全局共享的大盘快照
+_market_snapshot = MarketSnapshot()
+
+def get_market_snapshot():
+    """获取全局共享的大盘快照"""
+    return _market_snapshot
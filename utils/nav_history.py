@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基金历史净值本地存储与增量同步
+"""
+
+from datetime import datetime, timedelta
+
+from api.fund_api import FundAPI
+from database.db_manager import FundDB
+
+class NavHistoryStore:
+    """基金历史净值存储，首次分页回填，之后只获取本地最新日期之后的净值"""
+
+    PAGE_SIZE = 20  # 每次请求的条数
+    BACKFILL_DAYS = 180  # 首次回填的天数
+    MAX_PAGES = 20  # 单次同步最多请求的页数
+
+    def __init__(self, api=None):
+        self.api = api or FundAPI()
+
+    def sync(self, fund_code, cancel_event=None):
+        """
+        增量同步基金历史净值（阻塞，只能在后台线程调用）
+        :param fund_code: 基金代码
+        :param cancel_event: 取消事件，设置后停止翻页且不写入（避免只保存最新几页造成缺口）
+        :return: 新写入的条数，获取失败或已取消返回None
+        """
+        db = FundDB()
+        last_date = db.get_last_nav_date(fund_code)
+        db.close()
+
+        if last_date:
+            start_date = (datetime.strptime(last_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+            if start_date > datetime.now().strftime('%Y-%m-%d'):
+                return 0
+        else:
+            start_date = (datetime.now() - timedelta(days=self.BACKFILL_DAYS)).strftime('%Y-%m-%d')
+
+        nav_list = []
+        for page_index in range(1, self.MAX_PAGES + 1):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            page = self.api.get_fund_net_value_history(fund_code, page_index, self.PAGE_SIZE, start_date=start_date)
+            if page is None:
+                if page_index == 1:
+                    return None
+                break
+
+            rows, total_count = page
+            for row in rows:
+                # 接口忽略日期参数时按本地日期过滤
+                if not row['date'] or row['date'] < start_date:
+                    continue
+                nav_list.append(row)
+
+            if not rows or page_index * self.PAGE_SIZE >= total_count or rows[-1]['date'] < start_date:
+                break
+
+        if nav_list:
+            db = FundDB()
+            success = db.save_nav_history(fund_code, nav_list)
+            db.close()
+            if not success:
+                return None
+        return len(nav_list)
+
+    def get_history(self, fund_code, limit=None):
+        """
+        读取本地保存的历史净值（不发起网络请求）
+        :param fund_code: 基金代码
+        :param limit: 只取最近的条数
+        :return: 净值列表（按日期正序）
+        """
+        db = FundDB()
+        history = db.get_nav_history(fund_code, limit)
+        db.close()
+        return history
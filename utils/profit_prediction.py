@@ -4,39 +4,57 @@
 基金单日收益预测功能
 """
 
-import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 
+from api.fund_quote import parse_number
+from utils.market_snapshot import get_market_snapshot
+
 class ProfitPrediction:
     """基金收益预测类"""
     
+    # 基金数量达到该值时才使用numpy批量计算，numpy导入较慢，少量基金逐只计算即可
+    BATCH_THRESHOLD = 200
+    # 预测使用最近的交易日数，这些天的涨跌幅必须都存在
+    RECENT_DAYS = 5
+    
     def __init__(self):
         pass
     
-    def predict_daily_profit(self, fund_data, market_data):
+    @classmethod
+    def average_recent_growth(cls, history):
+        """
+        计算最近 RECENT_DAYS 个交易日的平均涨跌幅，三种预测方式共用同一规则
+        :param history: 涨跌幅序列（按日期正序），缺失值为None
+        :return: 平均涨跌幅，历史不足或最近几天有缺失时返回None
+        """
+        recent = list(history[-cls.RECENT_DAYS:])
+        if len(recent) < cls.RECENT_DAYS or any(growth is None for growth in recent):
+            return None
+        return sum(recent) / len(recent)
+    
+    def predict_daily_profit(self, fund_data, market_data=None, fund_type=None):
         """
         预测基金单日收益
-        :param fund_data: 基金历史数据
-        :param market_data: 市场数据
+        :param fund_data: 基金历史数据（按日期正序）
+        :param market_data: 市场数据，默认读取共享的大盘快照
+        :param fund_type: 基金类型，默认取fund_data第一项的type
         :return: 预测收益
         """
+        if market_data is None:
+            market_data = get_market_snapshot().get()
         try:
-            # 计算基金最近的涨跌幅
-            if len(fund_data) < 5:
+            # 计算最近5天的平均涨跌幅
+            avg_growth = self.average_recent_growth([parse_number(item['day_growth']) for item in fund_data])
+            if avg_growth is None:
                 return 0.0
             
-            # 提取最近5天的涨跌幅
-            recent_growth = [float(item['day_growth'].replace('+', '').replace('-', '')) for item in fund_data[-5:]]
-            
-            # 计算平均涨跌幅
-            avg_growth = np.mean(recent_growth)
-            
             # 计算市场情绪因子
             market_sentiment = self._calculate_market_sentiment(market_data)
             
             # 计算行业因子
-            industry_factor = self._calculate_industry_factor(fund_data[0].get('type', ''))
+            if fund_type is None:
+                fund_type = fund_data[0].get('type', '')
+            industry_factor = self._calculate_industry_factor(fund_type)
             
             # 综合预测
             predicted_profit = avg_growth * market_sentiment * industry_factor
@@ -66,7 +84,7 @@ class ProfitPrediction:
                     growth_rates.append(change_percent)
             
             if growth_rates:
-                avg_growth = np.mean(growth_rates)
+                avg_growth = sum(growth_rates) / len(growth_rates)
                 # 将市场情绪映射到0.5-1.5之间
                 if avg_growth > 1:
                     return 1.5
@@ -113,27 +131,156 @@ class ProfitPrediction:
             print(f"计算行业因子失败: {e}")
             return 1.0
     
-    def calculate_portfolio_profit(self, portfolio_funds, market_data):
+    def build_growth_matrix(self, quotes, days=RECENT_DAYS):
+        """
+        将多只基金的历史涨跌幅整理为矩阵
+        :param quotes: FundQuote列表
+        :param days: 保留最近的天数
+        :return: 涨跌幅矩阵（基金数 × days），历史不足的位置为NaN
+        """
+        import numpy as np
+        
+        matrix = np.full((len(quotes), days), np.nan)
+        for row, quote in enumerate(quotes):
+            history = (quote.history or (quote.day_growth,))[-days:]
+            if history:
+                matrix[row, days - len(history):] = [np.nan if growth is None else growth for growth in history]
+        return matrix
+    
+    def predict_batch(self, growth, fund_types, market_data=None):
+        """
+        批量预测基金单日收益
+        :param growth: 涨跌幅矩阵（基金数 × 天数，按日期正序），numpy数组或pandas.DataFrame，缺失值为NaN
+        :param fund_types: 每只基金的基金类型
+        :param market_data: 市场数据，默认读取共享的大盘快照
+        :return: 预测收益数组
+        """
+        import numpy as np
+        
+        if market_data is None:
+            market_data = get_market_snapshot().get()
+        
+        values = np.asarray(growth, dtype=float)
+        if values.ndim == 1:
+            values = values.reshape(-1, 1)
+        
+        # 规则与 average_recent_growth 相同：最近5天的涨跌幅都存在时取平均
+        if values.shape[1] < self.RECENT_DAYS:
+            return np.zeros(len(values))
+        recent = values[:, -self.RECENT_DAYS:]
+        valid = ~np.isnan(recent).any(axis=1)
+        avg_growth = np.where(valid[:, None], recent, 0.0).mean(axis=1)
+        
+        # 市场情绪因子只计算一次
+        market_sentiment = self._calculate_market_sentiment(market_data)
+        
+        # 行业因子按基金类型去重后查表
+        unique_types, type_index = np.unique(np.asarray(fund_types, dtype=object).astype(str), return_inverse=True)
+        type_factors = np.array([self._calculate_industry_factor(fund_type) for fund_type in unique_types])
+        industry_factor = type_factors[type_index.reshape(-1)] if len(unique_types) else np.ones(len(values))
+        
+        predicted = np.clip(avg_growth * market_sentiment * industry_factor, -5.0, 5.0)
+        predicted[~valid] = 0.0
+        return predicted
+    
+    def predict_quotes(self, quotes, market_data=None):
+        """
+        预测多只基金的单日收益，基金较少时逐只计算，不加载numpy
+        :param quotes: FundQuote列表
+        :param market_data: 市场数据，默认读取共享的大盘快照
+        :return: 预测收益列表，顺序与quotes一致
+        """
+        if market_data is None:
+            market_data = get_market_snapshot().get()
+        if len(quotes) >= self.BATCH_THRESHOLD:
+            growth = self.build_growth_matrix(quotes)
+            return self.predict_batch(growth, [quote.type for quote in quotes], market_data).tolist()
+        
+        market_sentiment = self._calculate_market_sentiment(market_data)
+        predictions = []
+        for quote in quotes:
+            avg_growth = self.average_recent_growth(quote.history or (quote.day_growth,))
+            if avg_growth is None:
+                predictions.append(0.0)
+                continue
+            predicted = avg_growth * market_sentiment * self._calculate_industry_factor(str(quote.type))
+            predictions.append(max(-5.0, min(5.0, predicted)))
+        return predictions
+    
+    def calculate_portfolio_profit(self, portfolio_funds, market_data=None):
         """
         计算组合收益
-        :param portfolio_funds: 组合中的基金数据
-        :param market_data: 市场数据
+        :param portfolio_funds: 组合中的基金行情（FundQuote列表）
+        :param market_data: 市场数据，默认读取共享的大盘快照
         :return: 组合预测收益
         """
+        if market_data is None:
+            market_data = get_market_snapshot().get()
         try:
             if not portfolio_funds:
                 return 0.0
             
-            # 计算每个基金的预测收益
-            total_profit = 0.0
-            for fund_data in portfolio_funds:
-                if fund_data:
-                    predicted_profit = self.predict_daily_profit([fund_data], market_data)
-                    total_profit += predicted_profit
+            # 批量计算每个基金的预测收益
+            quotes = [quote for quote in portfolio_funds if quote]
+            if not quotes:
+                return 0.0
+            predictions = self.predict_quotes(quotes, market_data)
             
             # 计算平均收益
-            avg_profit = total_profit / len(portfolio_funds)
+            avg_profit = sum(predictions) / len(portfolio_funds)
             return avg_profit
         except Exception as e:
             print(f"计算组合收益失败: {e}")
             return 0.0
+
+# 性能测试：批量预测与逐只预测对比
+if __name__ == '__main__':
+    import time
+    import numpy as np
+    
+    fund_count = 10000
+    days = 20
+    rng = np.random.default_rng(0)
+    growth = rng.normal(0, 1.5, size=(fund_count, days))
+    types = rng.choice(['股票型', '混合型-偏股', '债券型', '货币型', '指数型-股票', 'QDII', 'FOF'], size=fund_count)
+    market_data = {
+        '上证指数': {'change_percent': 0.4},
+        '深证成指': {'change_percent': 0.6},
+        '创业板指': {'change_percent': 0.9}
+    }
+    
+    predictor = ProfitPrediction()
+    
+    start = time.perf_counter()
+    fund_histories = [[{'day_growth': f"{value:+.2f}"} for value in row] for row in growth]
+    single = [predictor.predict_daily_profit(history, market_data, fund_type) for history, fund_type in zip(fund_histories, types)]
+    single_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    batch = predictor.predict_batch(np.round(growth, 2), types, market_data)
+    batch_time = time.perf_counter() - start
+    
+    print(f"逐只预测 {fund_count} 只基金: {single_time * 1000:.1f} ms")
+    print(f"批量预测 {fund_count} 只基金: {batch_time * 1000:.1f} ms")
+    print(f"结果最大差异: {np.max(np.abs(np.array(single) - batch)):.6f}")
+    
+    # 一致性检查：含缺失值的历史在三种预测方式下结果相同
+    from api.fund_quote import FundQuote
+    
+    histories = [
+        (1.0, 2.0, 3.0, None, 4.0, 5.0),
+        (1.0, 2.0, None, 3.0, 4.0, 5.0),
+        (1.0, 2.0, 3.0, 4.0, 5.0),
+        (2.0, 3.0, 4.0, 5.0),
+        (None, -1.0, 0.5, 2.0, 3.0, 1.5),
+        (0.3,),
+        ()
+    ]
+    quotes = [FundQuote(f"{i:06d}", '', '股票型', None, history[-1] if history else None, '', history)
+              for i, history in enumerate(histories)]
+    single = [predictor.predict_daily_profit([{'day_growth': growth} for growth in history], market_data, '股票型')
+              for history in histories]
+    small = predictor.predict_quotes(quotes, market_data)
+    batch = predictor.predict_quotes(quotes * predictor.BATCH_THRESHOLD, market_data)[:len(quotes)]
+    assert np.allclose(single, small) and np.allclose(single, batch), (single, small, batch)
+    print(f"缺失值一致性检查通过: {[round(value, 2) for value in single]}")
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基金批量刷新引擎
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from api.fund_api import FundAPI
+from api.fund_quote import FundQuote
+from database.db_manager import FundDB
+from utils.nav_history import NavHistoryStore
+
+# 刷新并发设置（可在“网络设置”中修改）
+_refresh_config = {
+    'max_workers': 8,  # 最大并发请求数
+    'per_host_limit': 4  # 单个主机的最大并发请求数
+}
+
+# 各主机的并发信号量，进程内所有刷新任务共享，单主机并发数对同时运行的任务整体生效
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+# 行情更新订阅者
+_quote_listeners = []
+_quote_listeners_lock = threading.Lock()
+
+# 各接口所在主机
+FUND_INFO_HOST = urlparse(FundAPI.FUND_INFO_URL).netloc
+FUND_NET_VALUE_HOST = urlparse(FundAPI.FUND_NET_VALUE_URL).netloc
+
+def get_refresh_config():
+    """
+    获取刷新并发设置
+    :return: 设置字典副本
+    """
+    return dict(_refresh_config)
+
+def set_refresh_config(max_workers=None, per_host_limit=None):
+    """
+    修改刷新并发设置：最大并发数对之后创建的刷新任务生效，单主机并发数对之后发起的请求生效
+    :param max_workers: 最大并发请求数
+    :param per_host_limit: 单个主机的最大并发请求数
+    """
+    if max_workers is not None:
+        _refresh_config['max_workers'] = max(1, int(max_workers))
+    if per_host_limit is not None and max(1, int(per_host_limit)) != _refresh_config['per_host_limit']:
+        with _host_slots_lock:
+            _refresh_config['per_host_limit'] = max(1, int(per_host_limit))
+            # 正在进行的请求仍释放到原信号量，之后的请求使用新的限制
+            _host_slots.clear()
+
+def host_slot(host):
+    """
+    获取主机并发信号量（进程内共享）
+    :param host: 主机名
+    :return: 信号量
+    """
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(_refresh_config['per_host_limit'])
+        return _host_slots[host]
+
+def subscribe_quotes(callback):
+    """
+    订阅基金行情更新，每只基金刷新完成并写入本地后调用，回调在工作线程中执行
+    :param callback: callback(quote)
+    """
+    with _quote_listeners_lock:
+        _quote_listeners.append(callback)
+
+def unsubscribe_quotes(callback):
+    """取消订阅基金行情更新"""
+    with _quote_listeners_lock:
+        if callback in _quote_listeners:
+            _quote_listeners.remove(callback)
+
+def _notify_quote(quote):
+    """通知行情订阅者"""
+    with _quote_listeners_lock:
+        listeners = list(_quote_listeners)
+    for callback in listeners:
+        try:
+            callback(quote)
+        except Exception as e:
+            print(f"通知行情订阅者失败: {e}")
+
+class FundRefreshEngine:
+    """基金批量刷新引擎，使用有界线程池并发获取组合内所有基金数据"""
+
+    HISTORY_DAYS = 30  # 随刷新结果返回的历史净值条数
+    BATCH_SIZE = 20  # 分批回调的最大条数
+    BATCH_INTERVAL = 0.1  # 分批回调的最长间隔（秒）
+
+    def __init__(self, api=None, max_workers=None):
+        self.api = api or FundAPI()
+        self.nav_store = NavHistoryStore(self.api)
+        self.max_workers = max_workers or get_refresh_config()['max_workers']
+
+    def fetch_fund(self, code, cancel_event=None):
+        """
+        获取单只基金的数据
+        :param code: 基金代码
+        :param cancel_event: 取消事件，已设置时不再发起新请求
+        :return: FundQuote，获取失败时error字段记录原因（净值同步失败但本地有历史时仍返回本地最新净值），已取消返回None
+        """
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        with host_slot(FUND_INFO_HOST):
+            fund_info = self.api.get_fund_info(code)
+        if not fund_info:
+            return self.error_quote(code, '基金信息获取失败')
+
+        # 增量同步历史净值，最新净值取本地历史的最后一条
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        with host_slot(FUND_NET_VALUE_HOST):
+            synced = self.nav_store.sync(code, cancel_event)
+        history = self.nav_store.get_history(code, self.HISTORY_DAYS)
+        if not history:
+            return self.error_quote(code, '净值获取失败', fund_info)
+
+        return self.history_quote(code, fund_info, history, '净值更新失败' if synced is None else None)
+
+    def load_local(self, fund_codes, fund_infos=None):
+        """
+        只用本地保存的数据生成基金行情（不发起网络请求），用于刷新完成前先显示上次的数据
+        :param fund_codes: 基金代码列表
+        :param fund_infos: 已知的基金信息 {基金代码: {'name', 'type'}}，其余从本地缓存查找
+        :return: 按输入顺序排列的FundQuote列表，状态为“本地数据”，本地没有净值的基金为“等待刷新”
+        """
+        db = FundDB()
+        known_funds = db.get_known_funds(fund_codes)
+        db.close()
+        known_funds.update(fund_infos or {})
+
+        quotes = []
+        for code in fund_codes:
+            fund_info = known_funds.get(code)
+            history = self.nav_store.get_history(code, self.HISTORY_DAYS)
+            if fund_info and history:
+                quotes.append(self.history_quote(code, fund_info, history, '本地数据'))
+            else:
+                quotes.append(self.error_quote(code, '等待刷新', fund_info))
+        return quotes
+
+    @staticmethod
+    def history_quote(code, fund_info, history, error=None):
+        """
+        由历史净值生成基金行情，最新净值取历史的最后一条
+        :param code: 基金代码
+        :param fund_info: 基金信息
+        :param history: 历史净值（按日期正序，不能为空）
+        :param error: 状态说明，为None表示数据已更新
+        :return: FundQuote
+        """
+        latest = history[-1]
+        return FundQuote(
+            code=code,
+            name=fund_info['name'],
+            type=fund_info['type'],
+            net_value=latest['net_value'],
+            day_growth=latest['day_growth'],
+            date=latest['date'],
+            history=tuple(nav['day_growth'] for nav in history),
+            error=error
+        )
+
+    @staticmethod
+    def error_quote(code, error, fund_info=None):
+        """
+        创建获取失败的基金记录
+        :param code: 基金代码
+        :param error: 失败原因
+        :param fund_info: 已获取的基金信息
+        :return: FundQuote
+        """
+        fund_info = fund_info or {}
+        return FundQuote(
+            code=code,
+            name=fund_info.get('name') or code,
+            type=fund_info.get('type', ''),
+            net_value=None,
+            day_growth=None,
+            date='',
+            error=error
+        )
+
+    def refresh(self, fund_codes, callback=None, batch_callback=None, cancel_event=None):
+        """
+        并发刷新基金数据
+        :param fund_codes: 基金代码列表
+        :param callback: 每只基金完成时的回调 callback(code, quote)，在工作线程中调用
+        :param batch_callback: 分批回调 batch_callback(quotes, done_count)，在调用线程中执行；
+                               第一只基金完成后立即回调，之后每 BATCH_SIZE 只或每 BATCH_INTERVAL 秒回调一次
+        :param cancel_event: 取消事件，设置后撤销未开始的请求并立即返回，不再回调
+        :return: 按输入顺序排列的FundQuote列表（获取失败的基金error字段不为空），取消时只含已完成的基金
+        """
+        if not fund_codes:
+            return []
+
+        results = {}
+        batch = []
+        last_flush = time.monotonic() - self.BATCH_INTERVAL
+        workers = min(self.max_workers, len(fund_codes))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        cancelled = False
+        try:
+            futures = {executor.submit(self.fetch_fund, code, cancel_event): code for code in fund_codes}
+            pending = set(futures)
+            while pending:
+                # 定时醒来，保证慢请求不会拖住已完成的结果，并及时响应取消
+                done, pending = wait(pending, timeout=self.BATCH_INTERVAL, return_when=FIRST_COMPLETED)
+                if cancel_event is not None and cancel_event.is_set():
+                    cancelled = True
+                    for future in pending:
+                        future.cancel()
+                    break
+                for future in done:
+                    code = futures[future]
+                    try:
+                        quote = future.result()
+                    except Exception as e:
+                        print(f"刷新基金 {code} 失败: {e}")
+                        quote = self.error_quote(code, '刷新失败')
+                    if quote is None:
+                        continue
+                    results[code] = quote
+                    batch.append(quote)
+                    if quote.error is None:
+                        _notify_quote(quote)
+                    if callback:
+                        callback(code, quote)
+
+                now = time.monotonic()
+                if batch_callback and batch and (
+                    len(batch) >= self.BATCH_SIZE or now - last_flush >= self.BATCH_INTERVAL or not pending
+                ):
+                    batch_callback(batch, len(results))
+                    batch = []
+                    last_flush = now
+        finally:
+            # 取消时不等待正在进行的请求，它们完成当前请求后检查取消事件退出
+            executor.shutdown(wait=not cancelled)
+
+        return [results[code] for code in fund_codes if code in results]
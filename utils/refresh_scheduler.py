@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自动刷新调度：只在相关市场的交易时段内按设定频率刷新
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from PyQt5.QtCore import QObject, QTimer, Qt
+
+from database.db_manager import FundDB
+
+# 各市场交易时段（当地时间）
+MARKET_SESSIONS = {
+    'A股': [((9, 30), (11, 30)), ((13, 0), (15, 0))],
+    '港股': [((9, 30), (12, 0)), ((13, 0), (16, 0))],
+    '美股': [((9, 30), (16, 0))]
+}
+
+# 内置休市日历（市场 -> 年份 -> 周末之外的全天休市日），新的年份直接追加到该文件中
+HOLIDAY_CALENDAR_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'market_holidays.json')
+
+def load_holiday_calendar(path=HOLIDAY_CALENDAR_PATH):
+    """
+    读取休市日历
+    :param path: 日历文件路径
+    :return: {市场名称: {年份: 日期字符串集合（YYYY-MM-DD）}}
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            calendar = json.load(f)
+        return {market: {int(year): set(dates) for year, dates in years.items()} for market, years in calendar.items()}
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"读取休市日历失败: {e}")
+        return {}
+
+MARKET_HOLIDAYS = load_holiday_calendar()
+
+# 用户在刷新设置中补充的休市日（内置日历未覆盖的年份或临时休市）
+CUSTOM_HOLIDAYS = {market: set() for market in MARKET_SESSIONS}
+
+# 已提示过缺少休市日历的 (市场, 年份)
+_warned_calendar_years = set()
+
+def _nth_sunday(year, month, n):
+    """
+    获取某月第n个星期日
+    :return: date
+    """
+    first = datetime(year, month, 1)
+    first_sunday = first + timedelta(days=(6 - first.weekday()) % 7)
+    return (first_sunday + timedelta(weeks=n - 1)).date()
+
+def _us_eastern_offset(now_utc):
+    """
+    计算美国东部时间相对UTC的偏移（夏令时：三月第二个星期日至十一月第一个星期日）
+    :param now_utc: UTC时间
+    :return: 偏移小时数
+    """
+    year = now_utc.year
+    dst_start = datetime.combine(_nth_sunday(year, 3, 2), datetime.min.time(), timezone.utc) + timedelta(hours=7)
+    dst_end = datetime.combine(_nth_sunday(year, 11, 1), datetime.min.time(), timezone.utc) + timedelta(hours=6)
+    return -4 if dst_start <= now_utc < dst_end else -5
+
+def market_local_time(market, now=None):
+    """
+    获取市场当地时间
+    :param market: 市场名称
+    :param now: UTC时间，默认当前时间
+    :return: 不带时区的当地时间
+    """
+    now_utc = now or datetime.now(timezone.utc)
+    offset = _us_eastern_offset(now_utc) if market == '美股' else 8
+    return (now_utc + timedelta(hours=offset)).replace(tzinfo=None)
+
+def is_market_open(market, now=None):
+    """
+    判断市场是否处于交易时段
+    :param market: 市场名称
+    :param now: UTC时间，默认当前时间
+    :return: 是否交易中
+    """
+    local_time = market_local_time(market, now)
+    if local_time.weekday() >= 5:
+        return False
+    if not holiday_calendar_covers(market, local_time.year) and (market, local_time.year) not in _warned_calendar_years:
+        # 没有该年的日历时无法识别节假日，按交易日处理并提示补充
+        _warned_calendar_years.add((market, local_time.year))
+        print(f"{market} 缺少 {local_time.year} 年的休市日历，节假日将按交易日刷新，"
+              f"请在刷新设置中补充休市日或更新 {HOLIDAY_CALENDAR_PATH}")
+    if is_market_holiday(market, local_time.strftime('%Y-%m-%d')):
+        return False
+    current = (local_time.hour, local_time.minute)
+    return any(start <= current < end for start, end in MARKET_SESSIONS.get(market, []))
+
+def is_market_holiday(market, date):
+    """
+    判断某天是否为市场休市日
+    :param market: 市场名称
+    :param date: 日期字符串（YYYY-MM-DD）
+    :return: 是否休市
+    """
+    return date in MARKET_HOLIDAYS.get(market, {}).get(int(date[:4]), ()) or date in CUSTOM_HOLIDAYS.get(market, ())
+
+def holiday_calendar_covers(market, year):
+    """
+    判断某年是否有休市日历（内置日历或用户补充的休市日）
+    :param market: 市场名称
+    :param year: 年份
+    :return: 是否有该年的休市日历
+    """
+    prefix = f'{year}-'
+    return year in MARKET_HOLIDAYS.get(market, {}) or any(
+        date.startswith(prefix) for date in CUSTOM_HOLIDAYS.get(market, ()))
+
+def missing_holiday_calendar(market, now=None):
+    """
+    检查市场当地当年是否缺少休市日历
+    :param market: 市场名称
+    :param now: UTC时间，默认当前时间
+    :return: 缺少日历的年份，有日历时返回None
+    """
+    year = market_local_time(market, now).year
+    return None if holiday_calendar_covers(market, year) else year
+
+def parse_holiday_dates(text):
+    """
+    解析以逗号或空白分隔的日期文本，忽略格式不正确的日期
+    :param text: 日期文本，如 "2027-01-01, 2027-02-08"
+    :return: 日期字符串列表（YYYY-MM-DD）
+    """
+    dates = []
+    for item in text.replace('，', ',').replace(',', ' ').split():
+        try:
+            dates.append(datetime.strptime(item, '%Y-%m-%d').strftime('%Y-%m-%d'))
+        except ValueError:
+            print(f"忽略无效的休市日: {item}")
+    return dates
+
+def set_market_holidays(market, dates):
+    """
+    设置市场的自定义休市日（内置日历之外）
+    :param market: 市场名称
+    :param dates: 日期字符串列表（YYYY-MM-DD）
+    """
+    CUSTOM_HOLIDAYS[market] = set(dates)
+
+class RefreshScheduler(QObject):
+    """自动刷新调度器：交易时段内按频率刷新可见的页面，休市时只做本地时间检查"""
+
+    SETTINGS_CACHE_KEY = 'refresh_settings'
+    IDLE_CHECK_INTERVAL = 300  # 休市期间检查开市的间隔（秒）
+    DUE_TOLERANCE = 1  # 距离到期不足该秒数的任务视为已到期
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.enabled = True
+        self.interval = 60  # 交易时段内的刷新间隔（秒）
+        self.jobs = []
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        # 默认的 CoarseTimer 可能提前触发，导致到期任务被跳过一个周期
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+        self.load_settings()
+
+    def load_settings(self):
+        """从数据库读取自动刷新设置"""
+        db = FundDB()
+        payload, _ = db.get_cache(self.SETTINGS_CACHE_KEY)
+        db.close()
+        if not payload:
+            return
+        try:
+            settings = json.loads(payload)
+            self.enabled = bool(settings.get('enabled', self.enabled))
+            self.interval = max(10, int(settings.get('interval', self.interval)))
+            for market, dates in settings.get('holidays', {}).items():
+                set_market_holidays(market, dates)
+        except (ValueError, TypeError) as e:
+            print(f"读取自动刷新设置失败: {e}")
+
+    def save_settings(self):
+        """保存自动刷新设置"""
+        settings = {
+            'enabled': self.enabled,
+            'interval': self.interval,
+            'holidays': {market: sorted(dates) for market, dates in CUSTOM_HOLIDAYS.items()}
+        }
+        db = FundDB()
+        db.set_cache(self.SETTINGS_CACHE_KEY, json.dumps(settings, ensure_ascii=False))
+        db.close()
+
+    def configure(self, enabled=None, interval=None, holidays=None):
+        """
+        修改自动刷新设置并立即生效
+        :param enabled: 是否启用自动刷新
+        :param interval: 刷新间隔（秒）
+        :param holidays: {市场名称: 自定义休市日列表}
+        """
+        if enabled is not None:
+            self.enabled = enabled
+        if interval is not None:
+            self.interval = max(10, int(interval))
+        if holidays is not None:
+            for market, dates in holidays.items():
+                set_market_holidays(market, dates)
+        self.save_settings()
+        self.start()
+
+    def add_job(self, name, callback, markets, is_visible=None):
+        """
+        注册自动刷新任务
+        :param name: 任务名称
+        :param callback: 刷新函数（在界面线程调用，应只启动后台刷新）
+        :param markets: 相关市场列表，任一市场交易中时才刷新
+        :param is_visible: 判断页面是否可见的函数，不可见时延后到可见再刷新
+        """
+        self.jobs.append({
+            'name': name,
+            'callback': callback,
+            'markets': markets,
+            'is_visible': is_visible,
+            'last_run': time.time()
+        })
+
+    def start(self):
+        """启动调度"""
+        self.timer.stop()
+        if self.enabled:
+            self.timer.start(0)
+
+    def stop(self):
+        """停止调度"""
+        self.timer.stop()
+
+    def run_stale_jobs(self):
+        """运行已过期且当前可见的任务（页面切换时调用）"""
+        if self.enabled:
+            self._run_due_jobs()
+
+    def _run_due_jobs(self):
+        """
+        运行到期的任务
+        :return: 距离下一个任务到期的秒数，没有相关市场处于交易时段时为None
+        """
+        now = time.time()
+        next_due = None
+        for job in self.jobs:
+            if not any(is_market_open(market) for market in job['markets']):
+                continue
+            remaining = self.interval - (now - job['last_run'])
+            if remaining <= self.DUE_TOLERANCE:
+                # 不可见的页面切换过来时再刷新，期间按刷新间隔继续检查
+                remaining = self.interval
+                if not job['is_visible'] or job['is_visible']():
+                    job['last_run'] = now
+                    try:
+                        job['callback']()
+                    except Exception as e:
+                        print(f"自动刷新 {job['name']} 失败: {e}")
+            next_due = remaining if next_due is None else min(next_due, remaining)
+        return next_due
+
+    def _tick(self):
+        """调度循环"""
+        if not self.enabled:
+            return
+        next_due = self._run_due_jobs()
+        # 休市期间不发起网络请求，只定期检查是否开市；交易时段内在最早到期的任务到期时再触发
+        next_interval = self.IDLE_CHECK_INTERVAL if next_due is None else max(next_due, self.DUE_TOLERANCE)
+        self.timer.start(int(next_interval * 1000))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时统计：启动各阶段耗时、模块首次导入耗时和启动期间的函数热点（python main.py --profile-startup）
+"""
+
+import builtins
+import sys
+import time
+from contextlib import contextmanager
+
+# 导入较慢、只在部分功能中按需加载的模块，报告中列出启动时是否已被加载
+HEAVY_MODULES = ('numpy', 'pandas', 'aiohttp')
+
+class StartupProfiler:
+    """启动耗时统计，阶段耗时始终记录，模块导入和函数热点只在需要时统计"""
+
+    def __init__(self, start_time=None):
+        """
+        :param start_time: 进程启动时间（time.perf_counter()），默认为创建时间
+        """
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.phases = []  # [(阶段名称, 开始时间, 结束时间)]
+        self.imports = {}  # 模块名 -> 首次导入耗时（秒，含其导入的子模块）
+        self._original_import = None
+        self._profile = None
+
+    def record(self, name, start, end=None):
+        """
+        记录一个启动阶段
+        :param name: 阶段名称
+        :param start: 开始时间（time.perf_counter()）
+        :param end: 结束时间，默认为当前时间
+        """
+        self.phases.append((name, start, time.perf_counter() if end is None else end))
+
+    @contextmanager
+    def phase(self, name):
+        """
+        统计with块的耗时
+        :param name: 阶段名称
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def install_import_hook(self):
+        """统计此后每个模块首次导入的耗时"""
+        if self._original_import is not None:
+            return
+        original_import = self._original_import = builtins.__import__
+        imports = self.imports
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original_import(name, globals, locals, fromlist, level)
+            start = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                imports.setdefault(name, time.perf_counter() - start)
+
+        builtins.__import__ = timed_import
+
+    def start_profile(self):
+        """开始统计函数调用耗时"""
+        import cProfile
+
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self):
+        """停止统计模块导入和函数调用耗时"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+        if self._profile is not None:
+            self._profile.disable()
+
+    def report(self, top=15):
+        """
+        生成耗时报告
+        :param top: 模块导入耗时和函数热点各显示的条数
+        :return: 报告文本
+        """
+        lines = ['启动阶段耗时:']
+        for name, start, end in sorted(self.phases, key=lambda item: (item[1], -item[2])):
+            lines.append(f"  {name}: {(end - start) * 1000:.1f} ms（启动后 {(end - self.start_time) * 1000:.1f} ms 完成）")
+
+        if self.imports:
+            lines.append(f'模块首次导入耗时（含子模块，前{top}个）:')
+            for name, elapsed in sorted(self.imports.items(), key=lambda item: -item[1])[:top]:
+                lines.append(f"  {name}: {elapsed * 1000:.1f} ms")
+
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        lines.append(f"启动时已加载的重量级模块: {', '.join(loaded) or '无'}")
+
+        if self._profile is not None:
+            import io
+            import pstats
+
+            stream = io.StringIO()
+            pstats.Stats(self._profile, stream=stream).sort_stats('cumulative').print_stats(top)
+            lines.append('启动期间函数耗时（按累计耗时排序）:')
+            lines.append(stream.getvalue().rstrip())
+        return '\n'.join(lines)